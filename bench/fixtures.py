@@ -0,0 +1,245 @@
+"""Fixture sites for the benchmark suite and a local stub server that serves them.
+
+Fixtures live in a directory with a manifest.json mapping request paths
+("/<host>/<path>?<query>") to files and content types. Two sources:
+
+  * generate_fixtures(): deterministic synthetic sites, one per city_sources.json
+    host (calendar -> meeting detail -> agenda PDF / minutes HTML)
+  * record_fixtures():  real pages and documents fetched from those hosts, with
+    links rewritten so they resolve against the stub server
+"""
+import re
+import json
+import random
+import asyncio
+import hashlib
+import pathlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import List, Dict, Tuple, Optional
+from urllib.parse import urlparse
+
+BENCH_DIR = pathlib.Path(__file__).resolve().parent
+FIXTURES_DIR = BENCH_DIR / "fixtures"
+
+_WORDS = ("council ordinance zoning parcel budget hearing amendment resident permit transit "
+          "housing library parks water sewer contract appointment commission variance district "
+          "fiscal public safety street lane sidewalk grant audit election notice minutes").split()
+
+
+def _prose(rng: random.Random, words: int) -> str:
+    out, line = [], []
+    for _ in range(words):
+        line.append(rng.choice(_WORDS))
+        if len(line) >= 12:
+            out.append(" ".join(line).capitalize() + ".")
+            line = []
+    return "\n".join(out)
+
+
+def make_pdf(pages: List[str]) -> bytes:
+    """Smallest valid text PDF pdfplumber will read; one Helvetica text block per page."""
+    n = len(pages)
+    kids = " ".join(f"{4 + 2 * i} 0 R" for i in range(n))
+    objs = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{kids}] /Count {n} >>",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, text in enumerate(pages):
+        objs.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                    f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>")
+        lines = [ln.replace("(", "").replace(")", "").replace("\\", "") for ln in text.split("\n")]
+        body = "BT /F1 9 Tf 40 750 Td 11 TL " + " ".join(f"({ln}) '" for ln in lines) + " ET"
+        objs.append(f"<< /Length {len(body)} >>\nstream\n{body}\nendstream")
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for k, o in enumerate(objs, 1):
+        offsets.append(len(out))
+        out += f"{k} 0 obj\n{o}\nendobj\n".encode()
+    xref = len(out)
+    out += f"xref\n0 {len(objs) + 1}\n0000000000 65535 f \n".encode()
+    for o in offsets:
+        out += f"{o:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(objs) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return out
+
+
+def _city_hosts(n: int) -> List[str]:
+    try:
+        sources = json.loads((BENCH_DIR.parent / "city_sources.json").read_text(encoding="utf-8"))
+    except Exception:
+        sources = {}
+    hosts = []
+    for urls in sources.values():
+        for u in urls:
+            h = urlparse(u).netloc
+            if h and h not in hosts:
+                hosts.append(h)
+    hosts = hosts[:n]
+    return hosts + [f"city{i}.example.gov" for i in range(n - len(hosts))]
+
+
+def _write_manifest(out: pathlib.Path, manifest: Dict[str, Dict[str, str]], seeds: List[str]) -> None:
+    (out / "manifest.json").write_text(json.dumps({"seeds": seeds, "files": manifest}, indent=1))
+
+
+def generate_fixtures(out: pathlib.Path = FIXTURES_DIR / "synthetic", hosts: int = 4,
+                      meetings: int = 6, pdf_pages: int = 4, seed: int = 17) -> pathlib.Path:
+    rng = random.Random(seed)
+    out.mkdir(parents=True, exist_ok=True)
+    manifest: Dict[str, Dict[str, str]] = {}
+    seeds: List[str] = []
+
+    def put(path: str, data: bytes, ctype: str) -> None:
+        name = hashlib.sha1(path.encode()).hexdigest()[:16] + (".pdf" if "pdf" in ctype else ".html")
+        (out / name).write_bytes(data)
+        manifest[path] = {"file": name, "content_type": ctype}
+
+    for n, real_host in enumerate(_city_hosts(hosts)):
+        # path prefix, not the real host name: names like novusagenda.com would turn every
+        # nav link into a keyword match
+        host = f"site{n}-{real_host.split('.')[0]}"
+        nav = "".join(f'<li><a href="/{host}/Dept{i}.aspx">Department {i}</a></li>' for i in range(80))
+        rows = []
+        for m in range(meetings):
+            rows.append(f'<tr><td><a href="/{host}/MeetingDetail.aspx?ID={m}">Meeting details</a></td>'
+                        f'<td>10/{m + 1:02d}/2025</td><td>Council Chambers</td></tr>')
+            detail = (f'<html><body><nav>{nav}</nav><h1>City Council meeting {m}</h1>'
+                      f'<a href="/{host}/docs/agenda-{m}.pdf">Agenda</a>'
+                      f'<a href="/{host}/minutes-{m}.html">Minutes</a></body></html>')
+            put(f"/{host}/MeetingDetail.aspx?ID={m}", detail.encode(), "text/html")
+            pages = [_prose(rng, 350) for _ in range(pdf_pages)]
+            put(f"/{host}/docs/agenda-{m}.pdf", make_pdf(pages), "application/pdf")
+            minutes = "".join(f"<p>{p}</p>" for p in _prose(rng, 900).split("\n"))
+            put(f"/{host}/minutes-{m}.html",
+                f"<html><body><nav>{nav}</nav><h1>Minutes {m}</h1>{minutes}</body></html>".encode(), "text/html")
+        calendar = (f"<html><head><title>Calendar</title></head><body><nav><ul>{nav}</ul></nav>"
+                    f"<table>{''.join(rows)}</table></body></html>")
+        put(f"/{host}/Calendar.aspx", calendar.encode(), "text/html")
+        seeds.append(f"/{host}/Calendar.aspx")
+
+    _write_manifest(out, manifest, seeds)
+    return out
+
+
+def _rewrite_links(html: bytes, host: str, hosts: List[str]) -> bytes:
+    text = html.decode("utf-8", errors="ignore")
+    for h in hosts:
+        text = re.sub(rf"https?://{re.escape(h)}/", f"/{h}/", text)
+    # root-relative links on the page's own host
+    text = re.sub(r'(href\s*=\s*["\'])/(?!/)(?!(?:%s)/)' % "|".join(re.escape(h) for h in hosts),
+                  rf"\1/{host}/", text)
+    return text.encode()
+
+
+async def record_fixtures(out: pathlib.Path = FIXTURES_DIR / "recorded", hosts: int = 4,
+                          docs_per_host: int = 5) -> pathlib.Path:
+    from civic_agents import http_client
+    from civic_agents.discovery import discover_sources_from
+
+    sources = json.loads((BENCH_DIR.parent / "city_sources.json").read_text(encoding="utf-8"))
+    picked: List[str] = []
+    for urls in sources.values():
+        for u in urls:
+            if urlparse(u).netloc not in [urlparse(p).netloc for p in picked]:
+                picked.append(u)
+    picked = picked[:hosts]
+    host_names = [urlparse(u).netloc for u in picked]
+
+    out.mkdir(parents=True, exist_ok=True)
+    manifest: Dict[str, Dict[str, str]] = {}
+    seeds: List[str] = []
+
+    async def save(url: str) -> bool:
+        try:
+            r = await http_client.get(url)
+            r.raise_for_status()
+        except Exception as e:
+            print(f"[bench] Could not record {url}: {e!r}")
+            return False
+        p = urlparse(url)
+        ctype = "application/pdf" if "pdf" in r.headers.get("content-type", "") else "text/html"
+        data = r.content if ctype == "application/pdf" else _rewrite_links(r.content, p.netloc, host_names)
+        path = f"/{p.netloc}{p.path or '/'}" + (f"?{p.query}" if p.query else "")
+        name = hashlib.sha1(path.encode()).hexdigest()[:16] + (".pdf" if ctype == "application/pdf" else ".html")
+        (out / name).write_bytes(data)
+        manifest[path] = {"file": name, "content_type": ctype}
+        return True
+
+    await http_client.start_client()
+    try:
+        for seed in picked:
+            if not await save(seed):
+                continue
+            p = urlparse(seed)
+            seeds.append(f"/{p.netloc}{p.path or '/'}" + (f"?{p.query}" if p.query else ""))
+            links = await discover_sources_from([seed], limit_per_site=docs_per_host, depth=1)
+            await asyncio.gather(*(save(u) for u in links if urlparse(u).netloc in host_names))
+    finally:
+        await http_client.close_client()
+    _write_manifest(out, manifest, seeds)
+    return out
+
+
+def load_manifest(path: pathlib.Path) -> Tuple[List[str], Dict[str, Tuple[bytes, str]]]:
+    m = json.loads((path / "manifest.json").read_text())
+    files = {k: ((path / v["file"]).read_bytes(), v["content_type"]) for k, v in m["files"].items()}
+    return m["seeds"], files
+
+
+class StubServer:
+    """Serves a fixture manifest on 127.0.0.1 with ETag support; unknown paths are 404."""
+
+    def __init__(self, files: Dict[str, Tuple[bytes, str]], latency: float = 0.0):
+        self.files = files
+        self.latency = latency
+        self.requests = 0
+        self._httpd: Optional[ThreadingHTTPServer] = None
+
+    def __enter__(self) -> "StubServer":
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests += 1
+                if stub.latency:
+                    threading.Event().wait(stub.latency)
+                hit = stub.files.get(self.path)
+                if hit is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                data, ctype = hit
+                etag = '"%s"' % hashlib.sha1(data).hexdigest()
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(data)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    @property
+    def base(self) -> str:
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}"
+
+    def url(self, path: str) -> str:
+        return self.base + path
+
+    def __exit__(self, *exc) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
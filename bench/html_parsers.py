@@ -0,0 +1,106 @@
+"""Compare HTML parser backends on saved city pages.
+
+    python -m bench.html_parsers                 # synthetic Legistar-style calendar
+    python -m bench.html_parsers pages/*.html    # saved pages
+    python -m bench.html_parsers --fetch pages/  # save every city_sources.json seed first
+"""
+import sys
+import json
+import time
+import asyncio
+import pathlib
+import argparse
+from typing import List, Tuple
+
+from civic_agents import html_backend
+from civic_agents.discovery import _clean_and_filter_links, MAX_CACHED_LINKS
+
+TEXT_DROP = ("script", "style", "nav", "header", "footer")
+
+
+def synthetic_calendar(rows: int = 2000) -> bytes:
+    # roughly the shape of a Legistar Calendar.aspx grid: lots of nav, one anchor-heavy table
+    nav = "".join(f'<li><a href="/Dept{i}.aspx">Department {i}</a></li>' for i in range(150))
+    body = "".join(
+        f'<tr><td><a href="/MeetingDetail.aspx?ID={i}&GUID=ABC{i}">City Council</a></td>'
+        f'<td>10/{i % 28 + 1:02d}/2025</td><td>9:30 AM</td><td>Council Chambers</td>'
+        f'<td><a href="/View.ashx?M=A&ID={i}">Agenda</a></td>'
+        f'<td><a href="/View.ashx?M=M&ID={i}">Minutes</a></td>'
+        f'<td><a href="/docs/packet-{i}.pdf">Packet</a></td></tr>'
+        for i in range(rows)
+    )
+    script = "<script>var x = '<a href=\"/fake\">agenda</a>';</script>" * 20
+    return (f"<html><head><title>Calendar</title>{script}</head><body><nav><ul>{nav}</ul></nav>"
+            f"<table>{body}</table><footer>City Clerk</footer></body></html>").encode()
+
+
+def load_pages(paths: List[str]) -> List[Tuple[str, bytes]]:
+    pages = []
+    for p in paths:
+        path = pathlib.Path(p)
+        files = sorted(path.glob("*.html")) if path.is_dir() else [path]
+        pages += [(f.name, f.read_bytes()) for f in files]
+    return pages or [("synthetic-calendar.html", synthetic_calendar())]
+
+
+async def fetch_pages(out_dir: str) -> None:
+    from civic_agents import http_client
+    out = pathlib.Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    sources = json.loads(pathlib.Path("city_sources.json").read_text(encoding="utf-8"))
+    seeds = [(city, u) for city, urls in sources.items() for u in urls]
+    await http_client.start_client()
+
+    async def one(city: str, url: str, i: int) -> None:
+        try:
+            r = await http_client.get(url)
+            r.raise_for_status()
+            name = "".join(ch for ch in city if ch.isalnum())
+            (out / f"{name}-{i}.html").write_bytes(r.content)
+        except Exception as e:
+            print(f"[bench] Failed {url}: {e!r}")
+
+    try:
+        await asyncio.gather(*(one(c, u, i) for i, (c, u) in enumerate(seeds)))
+    finally:
+        await http_client.close_client()
+
+
+def _time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best
+
+
+def run(pages: List[Tuple[str, bytes]], repeat: int) -> None:
+    total_mb = sum(len(b) for _, b in pages) / 1e6
+    print(f"{len(pages)} page(s), {total_mb:.2f} MB, best of {repeat}")
+    print(f"{'backend':<12}{'links s':>10}{'links MB/s':>12}{'text s':>10}{'text MB/s':>12}{'links':>8}  same as bs4")
+    base = "https://example.gov/Calendar.aspx"
+    reference = [html_backend.anchors(b, "bs4") for _, b in pages]
+    default = html_backend.BACKEND
+    for name in html_backend.BACKENDS:
+        html_backend.BACKEND = name
+        links = lambda: [_clean_and_filter_links(b, base, MAX_CACHED_LINKS) for _, b in pages]
+        text = lambda: [html_backend.html_to_text(b, TEXT_DROP) for _, b in pages]
+        hrefs = [html_backend.anchors(b) for _, b in pages]
+        same = all([h for h, _ in x] == [h for h, _ in y] for x, y in zip(hrefs, reference))
+        tl, tt = _time(links, repeat), _time(text, repeat)
+        print(f"{name:<12}{tl:>10.3f}{total_mb / tl:>12.1f}{tt:>10.3f}{total_mb / tt:>12.1f}"
+              f"{sum(len(x) for x in hrefs):>8}  {'yes' if same else 'NO'}")
+    html_backend.BACKEND = default
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("pages", nargs="*", help="saved .html files or directories")
+    ap.add_argument("--fetch", metavar="DIR", help="download every city_sources.json seed into DIR and exit")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+    if args.fetch:
+        asyncio.run(fetch_pages(args.fetch))
+        sys.exit(0)
+    run(load_pages(args.pages), args.repeat)
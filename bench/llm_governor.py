@@ -0,0 +1,70 @@
+"""Tune the LLM governor against the local fake model, no Gemini quota spent.
+
+    python -m bench.llm_governor --requests 200 --rpm 600 --latency 0.2 --fail-rate 0.02
+    python -m bench.llm_governor --no-governor      # naive concurrent calls, for comparison
+
+The fake enforces --rpm over a sliding 60s window like the real API. The governor
+is configured with the same budget; a good setting finishes near the quota rate
+with zero 429s.
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("--rpm", type=float, default=600, help="quota enforced by the fake and given to the governor")
+    ap.add_argument("--latency", type=float, default=0.2)
+    ap.add_argument("--fail-rate", type=float, default=0.02, help="share of calls failing with a 503")
+    ap.add_argument("--concurrency", type=int, default=None, help="CIVIC_LLM_CONCURRENCY")
+    ap.add_argument("--no-governor", action="store_true")
+    args = ap.parse_args()
+
+    # the governor reads its limits at import
+    os.environ["CIVIC_LLM_RPM"] = str(args.rpm)
+    os.environ.setdefault("CIVIC_LLM_BACKOFF_BASE", "0.5")
+    if args.concurrency:
+        os.environ["CIVIC_LLM_CONCURRENCY"] = str(args.concurrency)
+    from civic_agents import llm
+
+    get_model = llm.fake_model_factory(latency=args.latency, rpm=args.rpm, fail_rate=args.fail_rate, seed=1)
+    prompts = [f"Summarize council item {i}. " + "budget zoning parks " * 50 for i in range(args.requests)]
+
+    async def governed(p: str) -> bool:
+        try:
+            await llm.generate(p, ["fake-primary", "fake-fallback"], get_model)
+            return True
+        except Exception:
+            return False
+
+    async def naive(p: str) -> bool:
+        try:
+            await asyncio.to_thread(get_model("fake-primary").generate_content, p)
+            return True
+        except Exception:
+            return False
+
+    async def run() -> list:
+        call = naive if args.no_governor else governed
+        return await asyncio.gather(*(call(p) for p in prompts))
+
+    t = time.perf_counter()
+    ok = asyncio.run(run())
+    wall = time.perf_counter() - t
+
+    models = get_model.models
+    quota = sum(m.quota_errors for m in models.values())
+    failed = sum(m.errors for m in models.values())
+    print(f"mode={'naive' if args.no_governor else 'governor'} requests={args.requests} rpm={args.rpm:g}")
+    print(f"succeeded={sum(ok)} failed={len(ok) - sum(ok)} wall={wall:.1f}s "
+          f"throughput={sum(ok) / wall * 60:.0f}/min (quota {args.rpm:g}/min)")
+    print(f"429s={quota} 503s={failed} calls=" + ", ".join(f"{n}:{m.calls}" for n, m in models.items()))
+    return 0 if all(ok) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+"""Offline benchmark suite: no live city sites, no Gemini.
+
+    python -m bench.suite                          # synthetic fixtures, results to bench/results/
+    python -m bench.suite --record                 # record real pages from city_sources.json hosts first
+    python -m bench.suite --fixtures bench/fixtures/recorded
+    python -m bench.suite --compare bench/results/<old>.json
+
+Each benchmark reports ops/s, p50/p95 latency and the tracemalloc peak of one
+extra pass. --compare flags anything whose p50 got more than --tolerance slower.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import pathlib
+import platform
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+from datetime import datetime
+from typing import List, Dict, Any, Callable, Awaitable, Optional
+
+# isolated database and a dummy key before anything touches storage or the summarizer
+_TMP = tempfile.mkdtemp(prefix="civic-bench-")
+os.environ.setdefault("CIVIC_DB_PATH", os.path.join(_TMP, "bench.db"))
+os.environ.setdefault("CIVIC_ARTIFACT_DIR", os.path.join(_TMP, "artifacts"))
+os.environ.setdefault("GOOGLE_API_KEY", "bench")
+# the fake model has no quota; don't let the governor throttle the pipeline numbers
+os.environ.setdefault("CIVIC_LLM_RPM", "1000000")
+os.environ.setdefault("CIVIC_LLM_TPM", "1000000000")
+
+from bench.fixtures import FIXTURES_DIR, BENCH_DIR, StubServer, generate_fixtures, record_fixtures, load_manifest
+from civic_agents import http_client, summarizer, html_backend, llm
+from civic_agents.coordinator import process_link
+from civic_agents.discovery import discover_sources_from
+from civic_agents.extract import extract_text_from_bytes, shutdown_pdf_pool
+from storage.db import conn, close_all
+from storage.feed import CivicDoc, save_doc, get_feed
+
+RESULTS_DIR = BENCH_DIR / "results"
+BENCH_USER = "bench"
+BENCH_CITY = "Bench,ZZ,US"
+
+
+def _reset_db() -> None:
+    # process_link should do full work every pass, not hit the unchanged/duplicate/cache paths
+    with conn() as c:
+        for table in ("fetch_meta", "summary_cache", "doc_signatures", "doc_lsh", "doc_duplicates", "civic_docs",
+                      "civic_docs_fts"):
+            c.execute(f"DELETE FROM {table}")
+        c.commit()
+
+
+def _pct(xs: List[float], p: float) -> float:
+    xs = sorted(xs)
+    if not xs:
+        return 0.0
+    k = min(len(xs) - 1, max(0, int(round(p / 100 * (len(xs) - 1)))))
+    return xs[k]
+
+
+async def measure(name: str, ops: List[Callable[[], Awaitable[Any]]], iterations: int,
+                  concurrency: int = 1, setup: Optional[Callable[[], None]] = None,
+                  trace: bool = True) -> Dict[str, Any]:
+    """Run every op `iterations` times, `concurrency` at a time; one more traced pass for peak memory."""
+    lat: List[float] = []
+    sem = asyncio.Semaphore(concurrency)
+
+    async def timed(op) -> None:
+        async with sem:
+            t = time.perf_counter()
+            await op()
+            lat.append(time.perf_counter() - t)
+
+    wall = 0.0
+    for _ in range(iterations):
+        if setup:
+            setup()
+        t = time.perf_counter()
+        await asyncio.gather(*(timed(op) for op in ops))
+        wall += time.perf_counter() - t
+
+    peak = None
+    if trace:
+        if setup:
+            setup()
+        tracemalloc.start()
+        await asyncio.gather(*(op() for op in ops))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    out = {
+        "ops": len(lat),
+        "ops_per_sec": round(len(lat) / wall, 2) if wall else None,
+        "p50_ms": round(_pct(lat, 50) * 1000, 3),
+        "p95_ms": round(_pct(lat, 95) * 1000, 3),
+        "peak_mem_mb": round(peak / 1e6, 2) if peak is not None else None,
+    }
+    print(f"{name:<16}{out['ops']:>6}{out['ops_per_sec'] or 0:>10.1f}{out['p50_ms']:>10.2f}{out['p95_ms']:>10.2f}"
+          f"{out['peak_mem_mb'] or 0:>10.2f}")
+    return out
+
+
+def _sync(fn: Callable[[], Any]) -> Callable[[], Awaitable[Any]]:
+    async def op():
+        return fn()
+    return op
+
+
+def _doc(i: int) -> CivicDoc:
+    return CivicDoc(
+        url=f"https://bench.example.gov/doc/{i}", title=f"Bench doc {i}", tl_dr="Council approved the budget.",
+        what_changes=["Budget approved"], what_residents_should_know=["Parks hours extended"],
+        actions_for_residents=[], tags=["budget", "parks"] if i % 2 else ["zoning"], uncertainty=0.1,
+        fetched_at=datetime.utcnow().isoformat(), user_id=BENCH_USER, city=BENCH_CITY,
+        body="Council approved the parks budget and extended library hours. " * 20,
+    )
+
+
+async def run_suite(fixtures: pathlib.Path, iterations: int, concurrency: int, llm_latency: float,
+                    feed_docs: int, trace: bool) -> Dict[str, Any]:
+    seeds, files = load_manifest(fixtures)
+    fake = llm.FakeModel(latency=llm_latency)
+    summarizer._get_model = lambda name=None: fake
+
+    results: Dict[str, Any] = {}
+    print(f"{'benchmark':<16}{'ops':>6}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'peak MB':>10}")
+    await http_client.start_client()
+    try:
+        with StubServer(files) as stub:
+            seed_urls = [stub.url(s) for s in seeds]
+            doc_urls = [stub.url(p) for p in files if p not in seeds]
+
+            results["discover"] = await measure(
+                "discover", [lambda: discover_sources_from(seed_urls, limit_per_site=20)], iterations,
+                setup=_reset_db, trace=trace)
+
+            html = [b for b, ct in files.values() if ct == "text/html"]
+            pdfs = [b for b, ct in files.values() if ct == "application/pdf"]
+            results["extract_html"] = await measure(
+                "extract_html", [lambda b=b: extract_text_from_bytes(b, "text/html") for b in html],
+                iterations, concurrency, trace=trace)
+            if pdfs:
+                results["extract_pdf"] = await measure(
+                    "extract_pdf", [lambda b=b: extract_text_from_bytes(b, "application/pdf") for b in pdfs],
+                    iterations, concurrency, trace=trace)
+
+            results["process_link"] = await measure(
+                "process_link", [lambda u=u: process_link(u, BENCH_USER, BENCH_CITY) for u in doc_urls],
+                iterations, concurrency, setup=_reset_db, trace=trace)
+            results["process_link"]["llm_calls"] = fake.calls
+
+        results["save_doc"] = await measure(
+            "save_doc", [_sync(lambda i=i: save_doc(_doc(i))) for i in range(feed_docs)], 1, trace=trace)
+        results["get_feed"] = await measure(
+            "get_feed", [_sync(lambda: get_feed(BENCH_USER, limit=20))] * 50, iterations, trace=trace)
+        results["get_feed_filtered"] = await measure(
+            "get_feed_filter", [_sync(lambda: get_feed(city=BENCH_CITY, tag="parks", limit=20,
+                                                       before_id=feed_docs // 2))] * 50,
+            iterations, trace=trace)
+    finally:
+        await http_client.close_client()
+        shutdown_pdf_pool()
+        close_all()
+    return results
+
+
+def _git_rev() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR.parent,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any], tolerance: float) -> bool:
+    ok = True
+    print(f"\n{'benchmark':<20}{'old p50':>10}{'new p50':>10}{'change':>9}")
+    for name, r in new["results"].items():
+        prev = old.get("results", {}).get(name)
+        if not prev or not prev.get("p50_ms"):
+            continue
+        change = r["p50_ms"] / prev["p50_ms"] - 1
+        flag = "  REGRESSION" if change > tolerance else ""
+        ok = ok and not flag
+        print(f"{name:<20}{prev['p50_ms']:>10.2f}{r['p50_ms']:>10.2f}{change:>+9.1%}{flag}")
+    return ok
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Offline benchmarks for discovery, extraction, summarization and storage.")
+    ap.add_argument("--fixtures", help="fixture directory with manifest.json (default: synthetic)")
+    ap.add_argument("--record", action="store_true", help="record fixtures from city_sources.json hosts first")
+    ap.add_argument("--iterations", type=int, default=3)
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--llm-latency", type=float, default=0.0, help="seconds the fake model sleeps per call")
+    ap.add_argument("--feed-docs", type=int, default=2000)
+    ap.add_argument("--no-trace", action="store_true", help="skip the tracemalloc pass")
+    ap.add_argument("--out", help="results JSON path (default: bench/results/<timestamp>.json)")
+    ap.add_argument("--compare", help="previous results JSON to diff against")
+    ap.add_argument("--tolerance", type=float, default=0.10)
+    args = ap.parse_args()
+
+    if args.record:
+        fixtures = asyncio.run(record_fixtures())
+    elif args.fixtures:
+        fixtures = pathlib.Path(args.fixtures)
+    else:
+        fixtures = FIXTURES_DIR / "synthetic"
+        if not (fixtures / "manifest.json").exists():
+            generate_fixtures(fixtures)
+
+    results = asyncio.run(run_suite(fixtures, args.iterations, args.concurrency, args.llm_latency,
+                                    args.feed_docs, not args.no_trace))
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "git_rev": _git_rev(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "html_parser": html_backend.BACKEND,
+            "fixtures": str(fixtures),
+            "iterations": args.iterations,
+            "concurrency": args.concurrency,
+            "llm_latency": args.llm_latency,
+        },
+        "results": results,
+    }
+    out = pathlib.Path(args.out) if args.out else RESULTS_DIR / f"{datetime.utcnow():%Y%m%d-%H%M%S}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(f"\n[bench] Wrote {out}")
+
+    if args.compare:
+        old = json.loads(pathlib.Path(args.compare).read_text())
+        return 0 if compare(old, report, args.tolerance) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+import os
+import re
+import sys
+import json
+import time
+import difflib
+import pathlib
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+
+# City -> seed URLs from city_sources.json, parsed once and re-read only when
+# the file's mtime changes. Keys look like "NewYork,NY,US"; lookups go through
+# precomputed normalized keys so "New York", "new-york", "NYC", "St. Louis" /
+# "Saint Louis" and state names ("Florida") all resolve in O(1), with a
+# difflib fallback restricted to the same state for typos.
+CITY_SOURCES_PATH = pathlib.Path(os.getenv(
+    "CIVIC_CITY_SOURCES", str(pathlib.Path(__file__).resolve().parents[1] / "city_sources.json")))
+RELOAD_CHECK_SECONDS = float(os.getenv("CIVIC_CITY_SOURCES_CHECK_SECONDS", "1"))
+FUZZY_CUTOFF = float(os.getenv("CIVIC_CITY_FUZZY_CUTOFF", "0.85"))
+
+US_STATES = {
+    "alabama": "AL", "alaska": "AK", "arizona": "AZ", "arkansas": "AR", "california": "CA",
+    "colorado": "CO", "connecticut": "CT", "delaware": "DE", "districtofcolumbia": "DC", "florida": "FL",
+    "georgia": "GA", "hawaii": "HI", "idaho": "ID", "illinois": "IL", "indiana": "IN", "iowa": "IA",
+    "kansas": "KS", "kentucky": "KY", "louisiana": "LA", "maine": "ME", "maryland": "MD",
+    "massachusetts": "MA", "michigan": "MI", "minnesota": "MN", "mississippi": "MS", "missouri": "MO",
+    "montana": "MT", "nebraska": "NE", "nevada": "NV", "newhampshire": "NH", "newjersey": "NJ",
+    "newmexico": "NM", "newyork": "NY", "northcarolina": "NC", "northdakota": "ND", "ohio": "OH",
+    "oklahoma": "OK", "oregon": "OR", "pennsylvania": "PA", "rhodeisland": "RI", "southcarolina": "SC",
+    "southdakota": "SD", "tennessee": "TN", "texas": "TX", "utah": "UT", "vermont": "VT",
+    "virginia": "VA", "washington": "WA", "westvirginia": "WV", "wisconsin": "WI", "wyoming": "WY",
+    "puertorico": "PR",
+}
+_STATE_CODES = set(US_STATES.values())
+
+# normalized alias -> normalized city name; extend per deployment with an
+# "_aliases": {"NYC": "NewYork,NY,US"} object in city_sources.json
+ALIASES = {
+    "nyc": "newyork", "newyorkcity": "newyork", "manhattan": "newyork", "brooklyn": "newyork",
+    "la": "losangeles", "philly": "philadelphia", "sf": "sanfrancisco", "sanfran": "sanfrancisco",
+    "dc": "washington", "washingtondc": "washington", "vegas": "lasvegas", "nola": "neworleans",
+    "okc": "oklahomacity", "kc": "kansascity", "slc": "saltlakecity", "atl": "atlanta",
+    "nashvilledavidson": "nashville", "louisvillejefferson": "louisville",
+}
+
+# word-level spellings that should compare equal ("St. Louis" == "Saint Louis")
+_WORD_CANON = {"st": "saint", "ste": "sainte", "ft": "fort", "mt": "mount", "pt": "port"}
+_WORD = re.compile(r"[a-z0-9]+")
+_CAMEL = re.compile(r"(?<=[a-z])(?=[A-Z])")
+
+
+def norm_city(name: str) -> str:
+    # "FortWorth" / "Fort Worth" / "Ft. Worth" -> "fortworth"
+    words = _WORD.findall(_CAMEL.sub(" ", name or "").lower())
+    return "".join(_WORD_CANON.get(w, w) for w in words)
+
+
+def norm_region(region: Optional[str]) -> str:
+    r = (region or "").strip()
+    if len(r) <= 3:
+        return r.upper()
+    return US_STATES.get("".join(_WORD.findall(r.lower())), r.upper())
+
+
+def norm_country(country: Optional[str]) -> str:
+    c = (country or "US").strip().upper()
+    return "US" if c in ("USA", "UNITED STATES", "UNITED STATES OF AMERICA") else c
+
+
+class Registry:
+    """Immutable snapshot of city_sources.json plus its lookup indexes."""
+
+    def __init__(self, data: Dict[str, Any], mtime: float = 0.0):
+        self.mtime = mtime
+        self.sources: Dict[str, List[str]] = {}
+        self.by_full: Dict[Tuple[str, str, str], str] = {}
+        self.by_region: Dict[Tuple[str, str], str] = {}
+        self.by_city: Dict[str, List[str]] = {}
+        self.region_cities: Dict[str, List[str]] = {}
+        self.problems: List[Dict[str, Any]] = []
+        self.aliases = dict(ALIASES)
+
+        if not isinstance(data, dict):
+            self.problems.append({"key": None, "problem": "top level is not an object"})
+            data = {}
+        for alias, target in (data.get("_aliases") or {}).items():
+            self.aliases[norm_city(alias)] = norm_city(str(target).split(",")[0])
+
+        seed_owner: Dict[str, str] = {}
+        for key, seeds in data.items():
+            if key.startswith("_"):
+                continue
+            parts = [p.strip() for p in key.split(",")]
+            if len(parts) not in (2, 3) or not parts[0]:
+                self.problems.append({"key": key, "problem": "key is not City,REGION[,COUNTRY]"})
+                continue
+            city, region = norm_city(parts[0]), norm_region(parts[1])
+            country = norm_country(parts[2] if len(parts) == 3 else "US")
+            if country == "US" and region not in _STATE_CODES:
+                self.problems.append({"key": key, "problem": f"unknown US state {parts[1]!r}"})
+            if not isinstance(seeds, list) or not seeds:
+                self.problems.append({"key": key, "problem": "no seed URLs"})
+                continue
+            good = []
+            for u in seeds:
+                if not isinstance(u, str) or not u.lower().startswith(("http://", "https://")):
+                    self.problems.append({"key": key, "problem": f"not an http(s) URL: {u!r}"})
+                elif u in good:
+                    self.problems.append({"key": key, "problem": f"duplicate seed {u}"})
+                else:
+                    good.append(u)
+                    if u in seed_owner and seed_owner[u] != key:
+                        self.problems.append({"key": key, "problem": f"seed also used by {seed_owner[u]}: {u}"})
+                    seed_owner.setdefault(u, key)
+            if not good:
+                continue
+            full = (city, region, country)
+            if full in self.by_full:
+                self.problems.append({"key": key, "problem": f"same city as {self.by_full[full]}"})
+                continue
+            self.sources[key] = good
+            self.by_full[full] = key
+            self.by_region.setdefault((city, region), key)
+            self.by_city.setdefault(city, []).append(key)
+            self.region_cities.setdefault(region, []).append(city)
+
+    def resolve(self, city: str, region: Optional[str] = "", country: Optional[str] = "US") -> Optional[str]:
+        c, r, n = norm_city(city), norm_region(region), norm_country(country)
+        if not c:
+            return None
+        for name in dict.fromkeys((c, self.aliases.get(c, c))):
+            key = self.by_full.get((name, r, n)) or self.by_region.get((name, r))
+            if key:
+                return key
+            if not r and len(self.by_city.get(name, [])) == 1:
+                return self.by_city[name][0]  # no state given but the name is unique
+        # typo fallback: only against cities in the same state, so it stays cheap
+        pool = self.region_cities.get(r, []) if r else list(self.by_city)
+        match = difflib.get_close_matches(c, pool, n=1, cutoff=FUZZY_CUTOFF)
+        if match:
+            return self.by_region.get((match[0], r)) or self.by_city[match[0]][0]
+        return None
+
+    def report(self) -> Dict[str, Any]:
+        return {"path": str(CITY_SOURCES_PATH), "entries": len(self.sources), "problems": self.problems}
+
+
+_current: Optional[Registry] = None
+_checked = 0.0
+_lock = threading.Lock()
+
+
+def registry() -> Registry:
+    """The current registry, re-parsed only if city_sources.json changed on disk."""
+    global _current, _checked
+    now = time.monotonic()
+    if _current is not None and now - _checked < RELOAD_CHECK_SECONDS:
+        return _current
+    with _lock:
+        _checked = now
+        try:
+            mtime = CITY_SOURCES_PATH.stat().st_mtime
+        except OSError:
+            mtime = -1.0
+        if _current is not None and _current.mtime == mtime:
+            return _current
+        try:
+            with CITY_SOURCES_PATH.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            if _current is not None and mtime != -1.0:
+                print(f"[cities] Keeping previous registry, could not read {CITY_SOURCES_PATH}: {e!r}")
+                return _current
+            data = {}
+        _current = Registry(data, mtime)
+        if _current.problems:
+            print(f"[cities] {len(_current.problems)} problem(s) in {CITY_SOURCES_PATH.name}; see /debug/city-sources-report")
+        return _current
+
+
+def resolve_city(city: str, region: Optional[str] = "", country: Optional[str] = "US") -> Optional[str]:
+    return registry().resolve(city, region, country)
+
+
+def seeds_for_city(city: str, region: Optional[str] = "", country: Optional[str] = "US") -> List[str]:
+    reg = registry()
+    key = reg.resolve(city, region, country)
+    return list(reg.sources[key]) if key else []
+
+
+def city_sources() -> Dict[str, List[str]]:
+    return registry().sources
+
+
+if __name__ == "__main__":
+    # python -m civic_agents.city_registry  -> validation report, exit 1 if there are problems
+    rep = registry().report()
+    print(json.dumps(rep, indent=2))
+    sys.exit(1 if rep["problems"] else 0)
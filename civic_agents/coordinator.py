@@ -1,24 +1,29 @@
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 from .discovery import discover_sources
-from .extract import fetch_and_extract
 from .summarizer import summarize_text
 
 
-from storage import CivicDoc, save_doc
+from storage import CivicDoc
 
 
-from typing import List, Dict, Any, Optional
+import asyncio
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 
-from .extract import fetch_and_extract
+from .extract import fetch_if_changed, extract_text_from_bytes, ContentType
 from .summarizer import summarize_text
+from .dedupe import signature, band_keys, similarity, find_near_duplicate, count_check, DEDUPE_THRESHOLD
 
 
-from storage.feed import CivicDoc, save_doc
+from storage.feed import CivicDoc, save_doc_async, share_doc, latest_doc_for_url
+from storage.dedupe import save_signature, record_duplicate, duplicate_of
+from storage.fetch_meta import record_fetch
+from storage.artifacts import save_link_artifacts
 
 
-def _map_to_civicdoc(item: Dict[str, Any], source_label: Optional[str], user_id: str) -> CivicDoc:
+def _map_to_civicdoc(item: Dict[str, Any], source_label: Optional[str], user_id: str,
+                     city: Optional[str] = None) -> CivicDoc:
   
     title = item.get("title") or "Civic Update"
     tl_dr = item.get("why_matters") or ""
@@ -34,22 +39,111 @@ def _map_to_civicdoc(item: Dict[str, Any], source_label: Optional[str], user_id:
         uncertainty=0.3,
         fetched_at=datetime.utcnow().isoformat(),
         user_id=user_id,  
+        city=city,
+        body=item.get("body") or "",
     )
 
-async def process_link(url: str, user_id: str = "demo") -> Dict[str, Any]:
-    text = await fetch_and_extract(url)
-    item = await summarize_text(text, source_url=url)
-    civic_doc = _map_to_civicdoc(item, url, user_id)
-    save_doc(civic_doc)
+def unchanged_result(url: str) -> Dict[str, Any]:
+    return {"source_url": url, "status": "unchanged"}
+
+async def share_with_city(doc_id: Optional[int], city: Optional[str], user_id: Optional[str] = None) -> Optional[int]:
+    # fetch_meta and signatures are global, so a source another city already
+    # processed comes back unchanged/duplicate; make sure this city has the doc too
+    if not (doc_id and city):
+        return None
+    return await asyncio.to_thread(share_doc, doc_id, city, user_id)
+
+async def unchanged_link(url: str, user_id: Optional[str] = None, city: Optional[str] = None) -> Dict[str, Any]:
+    result = unchanged_result(url)
+    if city:
+        doc_id = (await asyncio.to_thread(latest_doc_for_url, url, city)
+                  or await asyncio.to_thread(duplicate_of, url))
+        shared = await share_with_city(doc_id, city, user_id)
+        if shared:
+            result["shared_as"] = shared
+    return result
+
+async def fetch_link(url: str) -> Optional[Tuple[bytes, ContentType, Dict[str, Optional[str]]]]:
+    return await fetch_if_changed(url)
+
+async def extract_link(url: str, data: bytes, ctype: ContentType) -> str:
+    text = await extract_text_from_bytes(data, ctype)
+    # keep body + text so the corpus can be re-summarized offline (civic_agents.reprocess)
+    try:
+        await asyncio.to_thread(save_link_artifacts, url, data, ctype, text)
+    except Exception as e:
+        print(f"[coordinator] Could not store artifacts for {url}: {e!r}")
+    return text
+
+def duplicate_result(url: str, doc_id: int, similarity: float) -> Dict[str, Any]:
+    return {"source_url": url, "status": "duplicate", "duplicate_of": doc_id, "similarity": round(similarity, 3)}
+
+async def _record_validators(url: str, validators: Optional[Dict[str, Optional[str]]]) -> None:
+    if validators:
+        await asyncio.to_thread(
+            record_fetch, url, validators.get("etag"), validators.get("last_modified"), validators.get("digest")
+        )
+
+# signatures of docs being summarized right now, so two copies of the same
+# agenda in one run don't both reach the model before either is indexed
+_inflight: List[Tuple[List[int], "asyncio.Future[Optional[int]]"]] = []
+
+def _match_inflight(sig: List[int]) -> Optional[Tuple["asyncio.Future[Optional[int]]", float]]:
+    for other, fut in _inflight:
+        sim = similarity(sig, other)
+        if sim >= DEDUPE_THRESHOLD:
+            return fut, sim
+    return None
+
+async def summarize_link(url: str, text: str, user_id: str = "demo",
+                         validators: Optional[Dict[str, Optional[str]]] = None,
+                         city: Optional[str] = None) -> Dict[str, Any]:
+    # HTML/PDF/amended copies of the same agenda link to the first doc instead
+    # of going through the model again
+    sig = await asyncio.to_thread(signature, text)
+    match: Optional[Tuple[int, float]] = None
+    entry = None
+    if sig:
+        hit = _match_inflight(sig)
+        if hit is None:
+            # register before the next await so a concurrent copy can find us
+            entry = (sig, asyncio.get_running_loop().create_future())
+            _inflight.append(entry)
+        else:
+            doc_id = await asyncio.shield(hit[0])
+            if doc_id is not None:
+                match = (doc_id, hit[1])
+
+    doc_id = None
+    try:
+        if match is None and sig:
+            match = await asyncio.to_thread(find_near_duplicate, sig)
+        if sig:
+            count_check(match is not None)
+        if match:
+            doc_id = match[0]
+            await asyncio.to_thread(record_duplicate, url, match[0], match[1])
+            await share_with_city(match[0], city, user_id)
+            await _record_validators(url, validators)
+            return duplicate_result(url, match[0], match[1])
+
+        item = await summarize_text(text, source_url=url, batch=True)
+        civic_doc = _map_to_civicdoc(item, url, user_id, city)
+        doc_id = await save_doc_async(civic_doc)
+        if sig:
+            await asyncio.to_thread(save_signature, doc_id, sig, band_keys(sig))
+    finally:
+        if entry is not None:
+            _inflight.remove(entry)
+            entry[1].set_result(doc_id)
+    await _record_validators(url, validators)
     item["source_url"] = url
     return item
 
-async def run_once(urls: List[str], user_id: str = "demo") -> List[Dict[str, Any]]:
-    results: List[Dict[str, Any]] = []
-    for u in urls:
-        try:
-            item = await process_link(u, user_id=user_id)  
-            results.append(item)
-        except Exception as e:
-            results.append({"source_url": u, "error": str(e)})
-    return results
+async def process_link(url: str, user_id: str = "demo", city: Optional[str] = None) -> Dict[str, Any]:
+    fetched = await fetch_link(url)
+    if fetched is None:
+        return await unchanged_link(url, user_id=user_id, city=city)
+    data, ctype, validators = fetched
+    text = await extract_link(url, data, ctype)
+    return await summarize_link(url, text, user_id=user_id, validators=validators, city=city)
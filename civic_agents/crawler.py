@@ -0,0 +1,150 @@
+import os
+import re
+import time
+import asyncio
+from typing import List, Dict, Set, Tuple, Optional
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+from urllib.robotparser import RobotFileParser
+
+from . import http_client
+
+# Depth-limited crawl used by discovery. Every seed is crawled concurrently,
+# so discovery takes about as long as the slowest host rather than the sum.
+# Depth 1 is the old behaviour (links on the seed page only); depth 2 reaches
+# agenda PDFs behind Legistar-style calendar -> meeting detail pages.
+CRAWL_DEPTH = int(os.getenv("CIVIC_DISCOVERY_DEPTH", "2"))
+CRAWL_MAX_PAGES = int(os.getenv("CIVIC_DISCOVERY_MAX_PAGES", "20"))   # pages fetched per seed
+CRAWL_CONCURRENCY = int(os.getenv("CIVIC_DISCOVERY_CONCURRENCY", "16"))
+ROBOTS_TTL = float(os.getenv("CIVIC_ROBOTS_TTL", "86400"))
+MAX_CRAWL_DELAY = float(os.getenv("CIVIC_MAX_CRAWL_DELAY", "10"))
+
+PDF_HINT = re.compile(r"\.pdf($|\?)", re.I)
+_TRACKING = re.compile(r"^(utm_|fbclid$|gclid$|mc_)", re.I)
+
+# host -> (parser or None for "allow all", fetched_at)
+_robots: Dict[str, Tuple[Optional[RobotFileParser], float]] = {}
+_robots_pending: Dict[str, asyncio.Future] = {}
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form used as the frontier dedupe key (never fetched): no fragment,
+    no tracking params, no default port."""
+    p = urlparse(url.strip())
+    scheme = p.scheme.lower()
+    host = (p.hostname or "").lower()
+    if p.port and not ((scheme == "http" and p.port == 80) or (scheme == "https" and p.port == 443)):
+        host = f"{host}:{p.port}"
+    query = urlencode([(k, v) for k, v in parse_qsl(p.query, keep_blank_values=True) if not _TRACKING.match(k)])
+    return urlunparse((scheme, host, p.path or "/", p.params, query, ""))
+
+
+async def _load_robots(origin: str) -> Optional[RobotFileParser]:
+    try:
+        r = await http_client.get(f"{origin}/robots.txt", crawl=True)
+    except Exception as e:
+        print(f"[crawler] robots.txt unavailable for {origin}: {e!r}")
+        return None
+    if r.status_code >= 400:
+        return None  # no robots.txt (or an error page): everything is allowed
+    rp = RobotFileParser()
+    rp.parse(r.text.splitlines())
+    return rp
+
+
+async def robots_for(url: str) -> Optional[RobotFileParser]:
+    p = urlparse(url)
+    origin = f"{p.scheme}://{p.netloc}".lower()
+    cached = _robots.get(origin)
+    if cached and time.monotonic() - cached[1] < ROBOTS_TTL:
+        return cached[0]
+    # one fetch per host even when many seeds on it start at once
+    fut = _robots_pending.get(origin)
+    if fut is None:
+        fut = asyncio.ensure_future(_load_robots(origin))
+        _robots_pending[origin] = fut
+        try:
+            rp = await fut
+        finally:
+            _robots_pending.pop(origin, None)
+        _robots[origin] = (rp, time.monotonic())
+        if rp is not None:
+            delay = rp.crawl_delay(http_client.USER_AGENT) or rp.crawl_delay("*")
+            if delay:
+                http_client.set_host_delay(p.netloc, min(float(delay), MAX_CRAWL_DELAY))
+        return rp
+    return await asyncio.shield(fut)
+
+
+async def allowed(url: str) -> bool:
+    rp = await robots_for(url)
+    return rp is None or rp.can_fetch(http_client.USER_AGENT, url)
+
+
+async def _crawl_seed(seed: str, limit: int, depth: int, seen: Set[str], sem: asyncio.Semaphore) -> List[str]:
+    from .discovery import _discover_page_links, MAX_CACHED_LINKS
+
+    host = urlparse(normalize_url(seed)).netloc
+    pdfs: List[str] = []
+    pages: List[str] = []
+    frontier = [seed]
+    fetched = 0
+
+    async def expand(url: str) -> List[str]:
+        async with sem:
+            try:
+                if not await allowed(url):
+                    print(f"[crawler] robots.txt disallows {url}")
+                    return []
+                return await _discover_page_links(url, MAX_CACHED_LINKS)
+            except Exception as e:
+                print(f"[crawler] Failed {url}: {e!r}")
+                return []
+
+    for level in range(depth):
+        frontier = frontier[:max(0, CRAWL_MAX_PAGES - fetched)]
+        if not frontier:
+            break
+        fetched += len(frontier)
+        batches = await asyncio.gather(*(expand(u) for u in frontier))
+        nxt: List[str] = []
+        for links in batches:
+            for link in links:
+                # dedupe on the canonical form, but keep the href as published:
+                # some portals 404 on a re-encoded query, and fetch_meta/doc
+                # rows are keyed by the original URL
+                key = normalize_url(link)
+                if key in seen:
+                    continue
+                seen.add(key)
+                if PDF_HINT.search(link):
+                    pdfs.append(link)
+                else:
+                    pages.append(link)
+                    if urlparse(key).netloc == host:
+                        nxt.append(link)  # only walk the seed's own site
+        frontier = nxt
+        if len(pdfs) >= limit:
+            break
+
+    # documents first; keyword pages fill the remainder as before
+    found = (pdfs + pages)[:limit]
+    allowed_flags = await asyncio.gather(*(allowed(u) for u in found))
+    return [u for u, ok in zip(found, allowed_flags) if ok]
+
+
+async def crawl(seeds: List[str], limit_per_site: int = 10, depth: int = CRAWL_DEPTH) -> List[str]:
+    seen: Set[str] = set()
+    roots: List[str] = []
+    for s in seeds:
+        u = normalize_url(s)
+        if u not in seen:
+            seen.add(u)
+            roots.append(s)  # fetch the seed as configured; fetch_meta is keyed by it
+
+    sem = asyncio.Semaphore(max(1, CRAWL_CONCURRENCY))
+    per_seed = await asyncio.gather(*(_crawl_seed(s, limit_per_site, max(1, depth), seen, sem) for s in roots))
+
+    found: List[str] = []
+    for urls in per_seed:
+        found.extend(urls)
+    return found
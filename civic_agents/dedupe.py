@@ -0,0 +1,82 @@
+import os
+import re
+import random
+import hashlib
+from typing import List, Set, Tuple, Optional, Dict, Any
+
+from storage.dedupe import candidates, dedupe_counts
+
+# MinHash over word shingles, banded for LSH lookups in storage/dedupe.py.
+# 16 bands x 4 rows puts the LSH candidate cut-off around 0.5 Jaccard; the
+# real decision is the estimated similarity against DEDUPE_THRESHOLD.
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = int(os.getenv("CIVIC_DEDUPE_SHINGLE_WORDS", "5"))
+DEDUPE_THRESHOLD = float(os.getenv("CIVIC_DEDUPE_THRESHOLD", "0.85"))
+
+# Shingles are already blake2b-mixed 64-bit values, so XOR with a fixed random
+# mask is enough to act as an independent permutation and is much cheaper in
+# pure Python than (a*x + b) mod p.
+_rng = random.Random(0x5EED)  # fixed seed: signatures must be stable across restarts
+_MASKS: List[int] = [_rng.getrandbits(64) for _ in range(NUM_PERM)]
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def shingles(text: str, k: int = SHINGLE_WORDS) -> Set[int]:
+    words = _WORD.findall((text or "").lower())
+    if not words:
+        return set()
+    if len(words) < k:
+        k = len(words)
+    out: Set[int] = set()
+    for i in range(len(words) - k + 1):
+        h = hashlib.blake2b(" ".join(words[i:i + k]).encode(), digest_size=8).digest()
+        out.add(int.from_bytes(h, "little"))
+    return out
+
+
+def signature(text: str) -> List[int]:
+    sh = shingles(text)
+    if not sh:
+        return []
+    return [min(x ^ m for x in sh) for m in _MASKS]
+
+
+def band_keys(sig: List[int]) -> List[str]:
+    keys = []
+    for b in range(BANDS):
+        chunk = sig[b * ROWS:(b + 1) * ROWS]
+        keys.append(hashlib.blake2b(repr(chunk).encode(), digest_size=8).hexdigest())
+    return keys
+
+
+def similarity(a: List[int], b: List[int]) -> float:
+    if not a or len(a) != len(b):
+        return 0.0
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+_STATS: Dict[str, int] = {"checked": 0, "duplicates": 0}
+
+
+def find_near_duplicate(sig: List[int], threshold: float = DEDUPE_THRESHOLD) -> Optional[Tuple[int, float]]:
+    """Return (doc_id, estimated Jaccard) of the closest stored doc at or above threshold."""
+    if not sig:
+        return None
+    best: Optional[Tuple[int, float]] = None
+    for doc_id, other in candidates(band_keys(sig)):
+        s = similarity(sig, other)
+        if s >= threshold and (best is None or s > best[1]):
+            best = (doc_id, s)
+    return best
+
+
+def count_check(duplicate: bool) -> None:
+    _STATS["checked"] += 1
+    if duplicate:
+        _STATS["duplicates"] += 1
+
+
+def dedupe_stats() -> Dict[str, Any]:
+    return {**_STATS, "threshold": DEDUPE_THRESHOLD, **dedupe_counts()}
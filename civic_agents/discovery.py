@@ -1,9 +1,14 @@
 import re
-from typing import List, Set
+import asyncio
+import hashlib
+from typing import List, Set, Optional
 from urllib.parse import urljoin, urlparse
 import httpx
-from bs4 import BeautifulSoup
 import os
+from . import http_client
+from .html_backend import anchors
+from .metrics import span
+from storage.fetch_meta import get_fetch_meta, record_fetch, touch_fetch
 
 
 DEFAULT_SEEDS: List[str] = [
@@ -14,6 +19,13 @@ DEFAULT_SEEDS: List[str] = [
 
 KEYWORDS = re.compile(r"(agenda|minutes|packet|meeting|notice|public\s*hearing)", re.I)
 PDF_HINT = re.compile(r"\.pdf($|\?)", re.I)
+# links stored per discovery page so an unchanged page can be answered from fetch_meta
+MAX_CACHED_LINKS = 200
+
+def page_key(url: str) -> str:
+    # fetch_meta row for a page read for its links; the same URL can also be
+    # summarized as a document, which keeps its own row under the bare URL
+    return "page:" + url
 
 def _seeds_from_env() -> List[str]:
     raw = os.getenv("CIVIC_SOURCE_URLS", "")
@@ -21,40 +33,54 @@ def _seeds_from_env() -> List[str]:
         return DEFAULT_SEEDS
     return [s.strip() for s in raw.split(",") if s.strip()]
 
-async def _fetch_html(url: str, client: httpx.AsyncClient) -> str:
-    r = await client.get(url, timeout=30, follow_redirects=True)
+async def _discover_page_links(url: str, limit: int) -> List[str]:
+    with span("discover_page", host=urlparse(url).netloc.lower()):
+        return await _page_links(url, limit)
+
+async def _page_links(url: str, limit: int) -> List[str]:
+    key = page_key(url)
+    meta = await asyncio.to_thread(get_fetch_meta, key)
+    if not meta or meta.get("links") is None:
+        meta = None  # never send validators without links to fall back on
+    with span("fetch_html", host=urlparse(url).netloc.lower()):
+        r = await http_client.conditional_get(url, meta, crawl=True)
+    if r.status_code == 304 and meta:
+        await asyncio.to_thread(touch_fetch, key)
+        return meta["links"][:limit]
     r.raise_for_status()
-    try:
-        return r.text
-    except Exception:
-        return r.content.decode(errors="ignore")
+    digest = hashlib.sha256(r.content).hexdigest()
+    if meta and meta.get("digest") == digest:
+        links = meta["links"]
+    else:
+        try:
+            html = r.text
+        except Exception:
+            html = r.content.decode(errors="ignore")
+        links = _clean_and_filter_links(html, url, MAX_CACHED_LINKS)
+    v = http_client.validators(r, digest)
+    await asyncio.to_thread(record_fetch, key, v["etag"], v["last_modified"], digest, links)
+    return links[:limit]
 
 def _clean_and_filter_links(html: str, base: str, limit: int) -> List[str]:
-    soup = BeautifulSoup(html, "html.parser")
-    for t in soup(["script", "style", "noscript"]):
-        t.extract()
-
     links: List[str] = []
     seen: Set[str] = set()
     base_netloc = urlparse(base).netloc
 
-    for a in soup.find_all("a", href=True):
-        href = a.get("href", "").strip()
-        if not href:
+    for href, text in anchors(html):
+        # cheap keyword test first; most anchors on a calendar page are navigation
+        if not (PDF_HINT.search(href) or KEYWORDS.search(href) or KEYWORDS.search(text)):
             continue
-        text = (a.get_text(" ") or "").strip()
-
         abs_url = urljoin(base, href)
-        if urlparse(abs_url).netloc and base_netloc and urlparse(abs_url).netloc != base_netloc:
-            if not PDF_HINT.search(abs_url):
-                continue
-
-        if PDF_HINT.search(abs_url) or KEYWORDS.search(href) or KEYWORDS.search(text):
-            if abs_url not in seen:
-                seen.add(abs_url)
-                links.append(abs_url)
-                if len(links) >= limit:
-                    break
+        is_pdf = PDF_HINT.search(abs_url)
+        netloc = urlparse(abs_url).netloc
+        if netloc and base_netloc and netloc != base_netloc and not is_pdf:
+            continue
+
+        if abs_url not in seen:
+            seen.add(abs_url)
+            links.append(abs_url)
+            if len(links) >= limit:
+                break
     return links
 
 async def discover_sources(limit_per_site: int = 10, max_sites: int = 5) -> List[str]:
@@ -62,47 +88,34 @@ async def discover_sources(limit_per_site: int = 10, max_sites: int = 5) -> List
     found: List[str] = []
     seen: Set[str] = set()
 
-    async with httpx.AsyncClient(follow_redirects=True) as client:
-        for seed in seeds:
-            try:
-                html = await _fetch_html(seed, client)
-                urls = _clean_and_filter_links(html, seed, limit_per_site)
-                for u in urls:
-                    if u not in seen:
-                        seen.add(u)
-                        found.append(u)
-            except Exception as e:
-                print(f"[discovery] Failed {seed}: {e!r}")
-                continue
+    for seed in seeds:
+        try:
+            urls = await _discover_page_links(seed, limit_per_site)
+            for u in urls:
+                if u not in seen:
+                    seen.add(u)
+                    found.append(u)
+        except Exception as e:
+            print(f"[discovery] Failed {seed}: {e!r}")
+            continue
     return found
 
 
 from typing import List, Set
 import httpx
 
-async def discover_sources_from(seeds: List[str], limit_per_site: int = 10, max_sites: int = 5) -> List[str]:
+# seeds per call; discovery crawls them concurrently so this no longer needs to be small
+MAX_SITES = int(os.getenv("CIVIC_DISCOVERY_MAX_SITES", "20"))
+
+async def discover_sources_from(seeds: List[str], limit_per_site: int = 10, max_sites: int = MAX_SITES,
+                                depth: Optional[int] = None) -> List[str]:
+    from .crawler import crawl, CRAWL_DEPTH
+
     if not seeds:
         return []
     seeds = [s for s in seeds if isinstance(s, str) and s.lower().startswith(("http://", "https://"))][:max_sites]
+    return await crawl(seeds, limit_per_site=limit_per_site, depth=CRAWL_DEPTH if depth is None else depth)
 
-    found: List[str] = []
-    seen: Set[str] = set()
-
-    async with httpx.AsyncClient(follow_redirects=True) as client:
-        for seed in seeds:
-            try:
-                html = await _fetch_html(seed, client)         
-                urls = _clean_and_filter_links(html, seed, limit_per_site)  
-                for u in urls:
-                    if u not in seen:
-                        seen.add(u)
-                        found.append(u)
-            except Exception as e:
-                print(f"[discovery] Failed {seed}: {e!r}")
-                continue
-    return found
-
-
-async def discover_sources(limit_per_site: int = 10, max_sites: int = 5) -> List[str]:
+async def discover_sources(limit_per_site: int = 10, max_sites: int = MAX_SITES) -> List[str]:
     seeds = _seeds_from_env() if "_seeds_from_env" in globals() else []
     return await discover_sources_from(seeds, limit_per_site=limit_per_site, max_sites=max_sites)
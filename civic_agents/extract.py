@@ -1,30 +1,140 @@
-import io
+import os
 import re
-from typing import Literal
-import httpx
-import pdfplumber
-from bs4 import BeautifulSoup
+import shutil
+import asyncio
+import hashlib
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Literal, Tuple, Optional, Dict, BinaryIO
+from urllib.parse import urlparse
+from . import http_client
+from .html_backend import html_to_text
+from .metrics import span, inc
+from . import pdf_worker
+from .summarizer import DOC_MAX_CHARS
+from storage.fetch_meta import get_fetch_meta, record_fetch, touch_fetch
 
 ContentType = Literal["application/pdf", "text/html", "text/plain"]
 
-async def fetch_and_extract(url: str) -> str:
-    async with httpx.AsyncClient(follow_redirects=True, timeout=30) as client:
-        r = await client.get(url)
-        r.raise_for_status()
-        ctype = r.headers.get("content-type", "").split(";")[0].lower()
-        return await extract_text_from_bytes(r.content, sniff_content_type(url, ctype))
+# pdfplumber runs in a separate process pool so a huge or malformed PDF can't
+# freeze the event loop, and a hung worker can be killed outright.
+PDF_WORKERS = int(os.getenv("CIVIC_PDF_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+PDF_TIMEOUT = float(os.getenv("CIVIC_PDF_TIMEOUT", "60"))
+PDF_MAX_PAGES = int(os.getenv("CIVIC_PDF_MAX_PAGES", "300"))
+PDF_MAX_MEMORY_MB = int(os.getenv("CIVIC_PDF_MAX_MEMORY_MB", "1024"))
+# stop parsing pages once the summarizer's input budget (all chunks) is full
+EXTRACT_MAX_CHARS = int(os.getenv("CIVIC_EXTRACT_MAX_CHARS", str(DOC_MAX_CHARS)))
+
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+_pdf_pool_generation = 0
+_pdf_slots: Dict[int, asyncio.Semaphore] = {}
+
+def _pdf_slot() -> asyncio.Semaphore:
+    # one per event loop, sized to the pool, so a document only starts its
+    # timeout once a worker is free rather than while queued behind others
+    loop = id(asyncio.get_running_loop())
+    s = _pdf_slots.get(loop)
+    if s is None:
+        s = _pdf_slots[loop] = asyncio.Semaphore(max(1, PDF_WORKERS))
+    return s
+
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    global _pdf_pool
+    if _pdf_pool is None:
+        # fresh interpreters, not forks of the app: the memory cap must not
+        # count the parent's threads, arenas and SDK clients
+        methods = multiprocessing.get_all_start_methods()
+        _pdf_pool = ProcessPoolExecutor(
+            max_workers=max(1, PDF_WORKERS),
+            mp_context=multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn"),
+            initializer=pdf_worker.init_worker,
+            initargs=(PDF_MAX_MEMORY_MB,),
+        )
+    return _pdf_pool
+
+def shutdown_pdf_pool(kill: bool = False) -> None:
+    global _pdf_pool, _pdf_pool_generation
+    pool, _pdf_pool = _pdf_pool, None
+    _pdf_pool_generation += 1
+    if pool is None:
+        return
+    if kill:
+        # shutdown() alone waits for the running task; terminate the workers
+        for proc in list((getattr(pool, "_processes", None) or {}).values()):
+            proc.terminate()
+    pool.shutdown(wait=not kill, cancel_futures=True)
+
+async def extract_pdf_text(source: pdf_worker.PdfSource, max_pages: int = PDF_MAX_PAGES,
+                           timeout: float = PDF_TIMEOUT, max_chars: int = EXTRACT_MAX_CHARS) -> str:
+    # source is raw bytes or a path; paths avoid pickling the body into the worker
+    loop = asyncio.get_running_loop()
+    async with _pdf_slot():
+        for attempt in range(2):
+            generation = _pdf_pool_generation
+            fut = loop.run_in_executor(_get_pdf_pool(), pdf_worker.pdf_text, source, max_pages, max_chars)
+            try:
+                text, pages = await asyncio.wait_for(fut, timeout)
+                inc("civic_pdf_pages_total", pages)
+                return text
+            except asyncio.TimeoutError:
+                shutdown_pdf_pool(kill=True)
+                raise TimeoutError(f"PDF extraction took longer than {timeout:g}s")
+            except BrokenProcessPool:
+                if generation != _pdf_pool_generation and attempt == 0:
+                    continue  # pool was killed for another document; try again on a fresh one
+                shutdown_pdf_pool(kill=True)
+                raise RuntimeError("PDF worker died (malformed PDF or memory limit exceeded)")
+        raise RuntimeError("PDF extraction failed")
+
+async def fetch_if_changed(url: str) -> Optional[Tuple[bytes, ContentType, Dict[str, Optional[str]]]]:
+    # None means the body is byte-identical to the last processed copy.
+    # The returned validators should be stored with record_fetch() once the
+    # document has been processed, so a failed run is retried next time.
+    meta = await asyncio.to_thread(get_fetch_meta, url)
+    with span("fetch", host=urlparse(url).netloc.lower()):
+        r = await http_client.conditional_get(url, meta)
+    if r.status_code == 304 and meta:
+        await asyncio.to_thread(touch_fetch, url)
+        return None
+    r.raise_for_status()
+    digest = hashlib.sha256(r.content).hexdigest()
+    v = http_client.validators(r, digest)
+    if meta and meta.get("digest") == digest:
+        await asyncio.to_thread(record_fetch, url, v["etag"], v["last_modified"], digest)
+        return None
+    ctype = r.headers.get("content-type", "").split(";")[0].lower()
+    return r.content, sniff_content_type(url, ctype), v
 
 async def extract_text_from_bytes(data: bytes, content_type: ContentType) -> str:
-    if content_type == "application/pdf":
-        with pdfplumber.open(io.BytesIO(data)) as pdf:
-            pages = [p.extract_text() or "" for p in pdf.pages]
-        return "\n".join(pages)
-    elif content_type == "text/html":
-        soup = BeautifulSoup(data, "html.parser")
-        for tag in soup(["script", "style", "nav", "header", "footer"]):
-            tag.extract()
-        text = soup.get_text(" ")
-        return _normalize(text)
+    with span("extract", kind=content_type.split("/")[-1]):
+        if content_type == "application/pdf":
+            return await extract_pdf_text(data)
+        # HTML parsing is CPU-bound too; keep it off the event loop
+        return await asyncio.to_thread(_extract_text_sync, data, content_type)
+
+async def extract_text_from_file(fp: BinaryIO, content_type: ContentType) -> str:
+    # uploads arrive as a SpooledTemporaryFile; PDFs are spilled to a real file
+    # the worker can open by path instead of being read into memory here
+    if content_type != "application/pdf":
+        data = await asyncio.to_thread(fp.read)
+        return await extract_text_from_bytes(data, content_type)
+    path = await asyncio.to_thread(_spool_to_disk, fp)
+    try:
+        return await extract_pdf_text(path)
+    finally:
+        os.unlink(path)
+
+def _spool_to_disk(fp: BinaryIO) -> str:
+    fp.seek(0)
+    with tempfile.NamedTemporaryFile(prefix="civic-", suffix=".pdf", delete=False) as out:
+        shutil.copyfileobj(fp, out, 1024 * 1024)
+        return out.name
+
+def _extract_text_sync(data: bytes, content_type: ContentType) -> str:
+    if content_type == "text/html":
+        return html_to_text(data, drop=("script", "style", "nav", "header", "footer"))
     else:
         return _normalize(data.decode(errors="ignore"))
 
@@ -39,4 +149,4 @@ def sniff_content_type(name_or_url: str | None, header_ctype: str | None) -> Con
 
 def _normalize(t: str) -> str:
     t = re.sub(r"\s+", " ", t)
-    return t.strip()
\ No newline at end of file
+    return t.strip()
@@ -0,0 +1,121 @@
+import os
+import math
+import json
+import pathlib
+import threading
+from typing import List, Dict, Optional, Tuple
+
+from .city_registry import registry
+
+# Nearest jurisdictions to a point, for users whose city string has no entry
+# in city_sources.json (suburbs, unincorporated areas). Centroids come from
+# the bundled city_centroids.json ("Key": [lat, lon], same keys as
+# city_sources.json) and are bucketed into a CELL_DEG grid, so a lookup only
+# computes haversine distances for the few cells around the user.
+CENTROIDS_PATH = pathlib.Path(os.getenv(
+    "CIVIC_CITY_CENTROIDS", str(pathlib.Path(__file__).resolve().parents[1] / "city_centroids.json")))
+NEAREST_K = int(os.getenv("CIVIC_NEAREST_K", "2"))
+NEAREST_MAX_KM = float(os.getenv("CIVIC_NEAREST_MAX_KM", "80"))
+CELL_DEG = 1.0
+EARTH_KM = 6371.0088
+_KM_PER_DEG = math.pi * EARTH_KM / 180
+
+Cell = Tuple[int, int]
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((p2 - p1) / 2) ** 2
+         + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _cell(lat: float, lon: float) -> Cell:
+    return int(math.floor(lat / CELL_DEG)), int(math.floor(lon / CELL_DEG))
+
+
+class GridIndex:
+    def __init__(self, points: Dict[str, Tuple[float, float]]):
+        self.points = points
+        self.cells: Dict[Cell, List[Tuple[str, float, float]]] = {}
+        for key, (lat, lon) in points.items():
+            self.cells.setdefault(_cell(lat, lon), []).append((key, lat, lon))
+        self._lon_cells = int(round(360 / CELL_DEG))
+
+    def _ring(self, ci: int, cj: int, r: int):
+        for i in range(ci - r, ci + r + 1):
+            for j in range(cj - r, cj + r + 1):
+                if max(abs(i - ci), abs(j - cj)) == r:
+                    # wrap longitude so points across the antimeridian are found
+                    jj = (j + self._lon_cells // 2) % self._lon_cells - self._lon_cells // 2
+                    yield from self.cells.get((i, jj), ())
+
+    def nearest(self, lat: float, lon: float, k: int = NEAREST_K,
+                max_km: float = NEAREST_MAX_KM) -> List[Tuple[str, float]]:
+        if not self.points:
+            return []
+        ci, cj = _cell(lat, lon)
+        found: List[Tuple[float, str]] = []
+        max_r = int(180 / CELL_DEG)
+        for r in range(max_r + 1):
+            for key, plat, plon in self._ring(ci, cj, r):
+                d = haversine_km(lat, lon, plat, plon)
+                if d <= max_km:
+                    found.append((d, key))
+            # anything in ring r+1 is at least r cells away; longitude cells
+            # shrink towards the poles, so use the narrowest one in range
+            shrink = math.cos(math.radians(min(89.0, abs(lat) + (r + 1) * CELL_DEG)))
+            bound = r * CELL_DEG * _KM_PER_DEG * max(shrink, 0.01)
+            if bound > max_km:
+                break
+            if len(found) >= k and sorted(found)[k - 1][0] <= bound:
+                break
+        return [(key, round(d, 2)) for d, key in sorted(found)[:k]]
+
+
+_index: Optional[GridIndex] = None
+_stamp: Tuple[float, float, int] = (0.0, 0.0, 0)
+_lock = threading.Lock()
+
+
+def _load_centroids() -> Dict[str, Tuple[float, float]]:
+    try:
+        with CENTROIDS_PATH.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception as e:
+        print(f"[geo] Could not read {CENTROIDS_PATH}: {e!r}")
+        return {}
+    out = {}
+    for key, v in data.items():
+        try:
+            lat, lon = float(v[0]), float(v[1])
+        except (TypeError, ValueError, IndexError):
+            print(f"[geo] Skipping bad centroid for {key}: {v!r}")
+            continue
+        if -90 <= lat <= 90 and -180 <= lon <= 180:
+            out[key] = (lat, lon)
+    return out
+
+
+def index() -> GridIndex:
+    """Grid over the centroids of jurisdictions that currently have seeds."""
+    global _index, _stamp
+    reg = registry()
+    try:
+        mtime = CENTROIDS_PATH.stat().st_mtime
+    except OSError:
+        mtime = -1.0
+    stamp = (mtime, reg.mtime, id(reg))
+    if _index is not None and stamp == _stamp:
+        return _index
+    with _lock:
+        if _index is None or stamp != _stamp:
+            points = {k: v for k, v in _load_centroids().items() if k in reg.sources}
+            _index, _stamp = GridIndex(points), stamp
+        return _index
+
+
+def nearest_jurisdictions(lat: float, lon: float, k: int = NEAREST_K,
+                          max_km: float = NEAREST_MAX_KM) -> List[Tuple[str, float]]:
+    """Up to k (registry key, distance km) pairs within max_km, closest first."""
+    return index().nearest(lat, lon, k, max_km)
@@ -0,0 +1,116 @@
+import os
+import re
+from typing import List, Tuple, Iterable, Union
+
+# Pluggable HTML parsing for discovery and extraction. BeautifulSoup with the
+# pure-Python "html.parser" dominated discovery CPU on large calendar pages,
+# so prefer a C parser when one is installed:
+#   selectolax (lexbor)  ->  lxml  ->  bs4 html.parser
+# CIVIC_HTML_PARSER=selectolax|lxml|bs4 pins a backend; "auto" picks the first available.
+Html = Union[str, bytes]
+Anchor = Tuple[str, str]   # (href, link text)
+
+DROP_TAGS = ("script", "style", "noscript")
+_WS = re.compile(r"\s+")
+
+
+def _selectolax_anchors(html: Html) -> List[Anchor]:
+    tree = LexborHTMLParser(html)
+    tree.strip_tags(list(DROP_TAGS))
+    out = []
+    for a in tree.css("a[href]"):
+        href = (a.attributes.get("href") or "").strip()
+        if href:
+            out.append((href, a.text(separator=" ").strip()))
+    return out
+
+
+def _selectolax_text(html: Html, drop: Iterable[str]) -> str:
+    tree = LexborHTMLParser(html)
+    tree.strip_tags(list(drop))
+    root = tree.root
+    return root.text(separator=" ") if root is not None else ""
+
+
+def _lxml_doc(html: Html):
+    try:
+        return lxml_html.document_fromstring(html)
+    except (lxml_etree.ParserError, ValueError):
+        return None  # empty or unparsable document
+
+
+def _lxml_anchors(html: Html) -> List[Anchor]:
+    doc = _lxml_doc(html)
+    if doc is None:
+        return []
+    lxml_etree.strip_elements(doc, *DROP_TAGS, with_tail=False)
+    out = []
+    for a in doc.iter("a"):
+        href = (a.get("href") or "").strip()
+        if href:
+            out.append((href, " ".join(a.itertext()).strip()))
+    return out
+
+
+def _lxml_text(html: Html, drop: Iterable[str]) -> str:
+    doc = _lxml_doc(html)
+    if doc is None:
+        return ""
+    lxml_etree.strip_elements(doc, *drop, with_tail=False)
+    return " ".join(doc.itertext())
+
+
+def _bs4_anchors(html: Html) -> List[Anchor]:
+    soup = BeautifulSoup(html, "html.parser")
+    for t in soup(list(DROP_TAGS)):
+        t.extract()
+    out = []
+    for a in soup.find_all("a", href=True):
+        href = a.get("href", "").strip()
+        if href:
+            out.append((href, (a.get_text(" ") or "").strip()))
+    return out
+
+
+def _bs4_text(html: Html, drop: Iterable[str]) -> str:
+    soup = BeautifulSoup(html, "html.parser")
+    for t in soup(list(drop)):
+        t.extract()
+    return soup.get_text(" ")
+
+
+BACKENDS = {}
+try:
+    from selectolax.lexbor import LexborHTMLParser
+    BACKENDS["selectolax"] = (_selectolax_anchors, _selectolax_text)
+except ImportError:
+    pass
+try:
+    from lxml import html as lxml_html, etree as lxml_etree
+    BACKENDS["lxml"] = (_lxml_anchors, _lxml_text)
+except ImportError:
+    pass
+from bs4 import BeautifulSoup
+BACKENDS["bs4"] = (_bs4_anchors, _bs4_text)
+
+
+def _pick_backend() -> str:
+    wanted = os.getenv("CIVIC_HTML_PARSER", "auto").lower()
+    if wanted in BACKENDS:
+        return wanted
+    if wanted != "auto":
+        print(f"[html] Parser {wanted!r} not available, using auto")
+    return next(iter(BACKENDS))
+
+
+BACKEND = _pick_backend()
+
+
+def anchors(html: Html, backend: str = "") -> List[Anchor]:
+    """(href, text) for every <a href> outside script/style/noscript."""
+    return BACKENDS[backend or BACKEND][0](html)
+
+
+def html_to_text(html: Html, drop: Iterable[str] = DROP_TAGS, backend: str = "") -> str:
+    """Visible text with the given tags removed, whitespace collapsed."""
+    return _WS.sub(" ", BACKENDS[backend or BACKEND][1](html, drop)).strip()
@@ -0,0 +1,137 @@
+import os
+import time
+import asyncio
+import contextvars
+from typing import Optional, Dict
+from urllib.parse import urlparse
+import httpx
+
+from .metrics import span, inc
+
+# One pooled client for the whole app: discovery, extraction and /summarize
+# all reuse keep-alive (and HTTP/2) connections to the same city hosts.
+HTTP_TIMEOUT = float(os.getenv("CIVIC_HTTP_TIMEOUT", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("CIVIC_HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("CIVIC_HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("CIVIC_HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("CIVIC_HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_PER_HOST = int(os.getenv("CIVIC_HTTP_PER_HOST", "6"))
+# minimum gap between requests to one host; background crawls raise it via politeness()
+HOST_MIN_DELAY = float(os.getenv("CIVIC_HOST_MIN_DELAY", "0"))
+USER_AGENT = os.getenv("CIVIC_USER_AGENT", "civic-assistant/0.1 (+https://github.com/MDiopp/Shellhacks-2025-Project)")
+
+_client: Optional[httpx.AsyncClient] = None
+_host_slots: Dict[str, asyncio.Semaphore] = {}
+_host_next: Dict[str, float] = {}
+_host_delay: Dict[str, float] = {}      # robots.txt Crawl-delay; only crawl=True requests wait for it
+_min_delay = contextvars.ContextVar("civic_host_min_delay", default=HOST_MIN_DELAY)
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _build_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=_http2_available(),
+        follow_redirects=True,
+        timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        headers={"User-Agent": USER_AGENT},
+    )
+
+
+async def start_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+    _client = None
+    _host_slots.clear()
+    _host_next.clear()
+
+
+def get_client() -> httpx.AsyncClient:
+    # scripts and one-off callers that never ran FastAPI startup get a lazy client
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+def _host_slot(url: str) -> asyncio.Semaphore:
+    host = urlparse(url).netloc.lower()
+    slot = _host_slots.get(host)
+    if slot is None:
+        slot = _host_slots[host] = asyncio.Semaphore(max(1, HTTP_PER_HOST))
+    return slot
+
+
+def set_host_delay(host: str, seconds: float) -> None:
+    _host_delay[host.lower()] = max(0.0, seconds)
+
+
+def politeness(seconds: float) -> contextvars.Token:
+    # applies to requests made from this task and the tasks it spawns
+    return _min_delay.set(seconds)
+
+
+def reset_politeness(token: contextvars.Token) -> None:
+    _min_delay.reset(token)
+
+
+async def _polite_wait(host: str, crawl: bool = False) -> None:
+    delay = max(_min_delay.get(), _host_delay.get(host, 0.0) if crawl else 0.0)
+    if delay <= 0:
+        return
+    now = time.monotonic()
+    start = max(now, _host_next.get(host, 0.0))
+    _host_next[host] = start + delay  # reserve our turn before sleeping
+    if start > now:
+        await asyncio.sleep(start - now)
+
+
+async def get(url: str, *, crawl: bool = False, **kwargs) -> httpx.Response:
+    # crawl=True for discovery/crawler requests, which honour robots.txt Crawl-delay;
+    # fetches made for a user (e.g. /summarize) don't wait on it
+    host = urlparse(url).netloc.lower()
+    async with _host_slot(url):
+        await _polite_wait(host, crawl)
+        with span("http", host=host):
+            r = await get_client().get(url, **kwargs)
+    inc("civic_http_requests_total", host=host, status=r.status_code)
+    inc("civic_fetch_bytes_total", len(r.content), host=host)
+    return r
+
+
+async def conditional_get(url: str, meta: Optional[Dict] = None, *, crawl: bool = False, **kwargs) -> httpx.Response:
+    # meta is a storage.fetch_meta row; a 304 means our stored copy is still current
+    headers = dict(kwargs.pop("headers", None) or {})
+    if meta:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+    return await get(url, headers=headers, crawl=crawl, **kwargs)
+
+
+def validators(r: httpx.Response, digest: str) -> Dict[str, Optional[str]]:
+    return {
+        "etag": r.headers.get("etag"),
+        "last_modified": r.headers.get("last-modified"),
+        "digest": digest,
+    }
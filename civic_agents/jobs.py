@@ -0,0 +1,136 @@
+import os
+import json
+import asyncio
+import hashlib
+from typing import List, Dict, Optional, Tuple
+
+from .discovery import discover_sources_from
+from .pipeline import iter_pipeline
+from storage.jobs import (
+    create_job, find_active_job, active_job_ids, set_job_status,
+    set_job_urls, record_job_item, get_job,
+)
+from storage.subscriptions import record_city_run
+
+# Agent runs as background jobs: state lives in civic.db so a restart picks
+# up where it left off, and identical seed sets for one city share a job.
+JOB_WORKERS = int(os.getenv("CIVIC_JOB_WORKERS", "2"))
+
+_queue: Optional[asyncio.Queue] = None
+_workers: List[asyncio.Task] = []
+_running: Dict[str, asyncio.Task] = {}
+_cancelled: set = set()   # job ids cancelled through cancel_job()
+_submit_lock = asyncio.Lock()
+
+
+def job_key(seeds: List[str], limit_per_site: int, city: Optional[str] = None) -> str:
+    # docs are saved under the job's city, so only the same city can share a job
+    raw = json.dumps({"seeds": sorted(set(seeds)), "limit": limit_per_site, "city": city})
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _item_status(r: Dict) -> str:
+    if "error" in r:
+        return "error"
+    if r.get("status") in ("unchanged", "duplicate"):
+        return r["status"]
+    return "ok"
+
+
+async def _run_job(job_id: str) -> None:
+    job = await asyncio.to_thread(get_job, job_id)
+    if not job or job["status"] not in ("queued", "running"):
+        return
+    await asyncio.to_thread(set_job_status, job_id, "running")
+
+    if not job["items"]:
+        urls = await discover_sources_from(job["seeds"], limit_per_site=job["limit_per_site"])
+        await asyncio.to_thread(set_job_urls, job_id, urls)
+        job = await asyncio.to_thread(get_job, job_id)
+
+    # after a restart only the links that never finished are processed again
+    pending = [it for it in job["items"] if it["status"] == "pending"]
+    urls = [it["url"] for it in pending]
+    async for i, r in iter_pipeline(urls, user_id=job["user_id"], city=job["city"]):
+        await asyncio.to_thread(record_job_item, job_id, pending[i]["index"], _item_status(r), r)
+
+    await asyncio.to_thread(set_job_status, job_id, "done")
+    if job["city"]:
+        done = await asyncio.to_thread(get_job, job_id, False)
+        await asyncio.to_thread(record_city_run, job["city"], job["seeds"], {
+            "seeds_used": job["seeds"],
+            "discovered": done["progress"]["total"],
+            **{k: v for k, v in done["progress"].items() if k not in ("total", "done", "errors")},
+            "job_id": job_id,
+        })
+
+
+async def _worker() -> None:
+    while True:
+        job_id = await _queue.get()
+        task = asyncio.create_task(_run_job(job_id))
+        _running[job_id] = task
+        try:
+            await task
+        except asyncio.CancelledError:
+            # only a cancel_job() cancellation is handled here; anything else
+            # (stop_workers() cancelling this worker) must propagate
+            me = asyncio.current_task()
+            if job_id not in _cancelled or (me is not None and me.cancelling()):
+                raise
+        except Exception as e:
+            print(f"[jobs] Job {job_id} failed: {e!r}")
+            await asyncio.to_thread(set_job_status, job_id, "failed", str(e))
+        finally:
+            _running.pop(job_id, None)
+            _cancelled.discard(job_id)
+
+
+async def start_workers() -> None:
+    global _queue
+    if _queue is not None:
+        return
+    _queue = asyncio.Queue()
+    for job_id in await asyncio.to_thread(active_job_ids):
+        await _queue.put(job_id)
+    _workers.extend(asyncio.create_task(_worker()) for _ in range(max(1, JOB_WORKERS)))
+
+
+async def stop_workers() -> None:
+    # jobs left "running" in the DB are resumed by the next start_workers()
+    global _queue
+    for t in _workers:
+        t.cancel()
+    for t in list(_running.values()):
+        t.cancel()
+    await asyncio.gather(*_workers, *_running.values(), return_exceptions=True)
+    _workers.clear()
+    _running.clear()
+    _queue = None
+
+
+async def submit_job(user_id: str, seeds: List[str], limit_per_site: int = 10,
+                     city: Optional[str] = None) -> Tuple[str, bool]:
+    """Queue a run and return (job_id, coalesced)."""
+    if _queue is None:
+        await start_workers()
+    key = job_key(seeds, limit_per_site, city)
+    async with _submit_lock:
+        existing = await asyncio.to_thread(find_active_job, key)
+        if existing:
+            return existing, True
+        job_id = await asyncio.to_thread(create_job, key, user_id, seeds, limit_per_site, city)
+    await _queue.put(job_id)
+    return job_id, False
+
+
+async def cancel_job(job_id: str) -> bool:
+    job = await asyncio.to_thread(get_job, job_id, False)
+    if not job or job["status"] not in ("queued", "running"):
+        return False
+    await asyncio.to_thread(set_job_status, job_id, "cancelled")
+    task = _running.get(job_id)
+    if task:
+        _cancelled.add(job_id)
+        task.cancel()
+    return True
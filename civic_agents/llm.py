@@ -0,0 +1,366 @@
+import os
+import re
+import time
+import json
+import random
+import asyncio
+import hashlib
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from .metrics import span, inc
+
+# Governor for Gemini calls: every generate_content goes through here.
+#  - requests/minute and tokens/minute token buckets per model, so we slow
+#    down before the API starts returning 429s
+#  - at most LLM_CONCURRENCY calls in flight
+#  - transient errors are retried with full-jitter exponential backoff
+#  - failover to GEMINI_FALLBACK_MODEL depends on the error (see classify())
+LLM_RPM = float(os.getenv("CIVIC_LLM_RPM", "15"))
+LLM_TPM = float(os.getenv("CIVIC_LLM_TPM", "1000000"))
+LLM_CONCURRENCY = int(os.getenv("CIVIC_LLM_CONCURRENCY", "4"))
+LLM_MAX_RETRIES = int(os.getenv("CIVIC_LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_BASE = float(os.getenv("CIVIC_LLM_BACKOFF_BASE", "1"))
+LLM_BACKOFF_MAX = float(os.getenv("CIVIC_LLM_BACKOFF_MAX", "30"))
+LLM_TIMEOUT = float(os.getenv("CIVIC_LLM_TIMEOUT", "120"))
+# share of the per-minute budget that may be spent in a burst; the refill rate is
+# lowered by the same amount so no 60s window ever exceeds the quota
+LLM_BURST = float(os.getenv("CIVIC_LLM_BURST", "0.1"))
+# output tokens reserved up front; corrected from usage_metadata afterwards
+LLM_EXPECTED_OUTPUT_TOKENS = int(os.getenv("CIVIC_LLM_EXPECTED_OUTPUT_TOKENS", "512"))
+# use the SDK's native generate_content_async instead of a worker thread per call
+LLM_ASYNC = os.getenv("CIVIC_LLM_ASYNC", "1") == "1"
+
+ModelFactory = Callable[[Optional[str]], Any]
+
+
+class TokenBucket:
+    """At most `per_minute` units in any 60s window: a burst of `burst` x budget, then a steady refill."""
+
+    def __init__(self, per_minute: float, burst: float = LLM_BURST):
+        per_minute = max(1.0, per_minute)
+        self.capacity = max(1.0, per_minute * burst)
+        self.rate = max(per_minute - self.capacity, 1.0) / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self._locks: Dict[int, asyncio.Lock] = {}  # per event loop, like _slot()
+
+    def _lock(self) -> asyncio.Lock:
+        loop = id(asyncio.get_running_loop())
+        lock = self._locks.get(loop)
+        if lock is None:
+            lock = self._locks[loop] = asyncio.Lock()
+        return lock
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, n: float = 1) -> float:
+        """Take n units, sleeping until they are available. Returns seconds waited."""
+        n = min(n, self.capacity)  # a single huge prompt must not wait forever
+        waited = 0.0
+        async with self._lock():  # FIFO: later callers queue behind the one waiting
+            while True:
+                self._refill()
+                if self.level >= n:
+                    self.level -= n
+                    return waited
+                delay = (n - self.level) / self.rate
+                waited += delay
+                await asyncio.sleep(delay)
+
+    def debit(self, n: float) -> None:
+        # settle the difference between the estimate and the real usage (may go negative)
+        self._refill()
+        self.level = min(self.capacity, self.level - n)
+
+
+_buckets: Dict[str, Tuple[TokenBucket, TokenBucket]] = {}
+_slots: Dict[int, asyncio.Semaphore] = {}
+
+
+def _limits(model: str) -> Tuple[TokenBucket, TokenBucket]:
+    b = _buckets.get(model)
+    if b is None:
+        b = _buckets[model] = (TokenBucket(LLM_RPM), TokenBucket(LLM_TPM))
+    return b
+
+
+def _slot() -> asyncio.Semaphore:
+    # one semaphore per event loop (tests and scripts run their own loops)
+    loop = id(asyncio.get_running_loop())
+    s = _slots.get(loop)
+    if s is None:
+        s = _slots[loop] = asyncio.Semaphore(max(1, LLM_CONCURRENCY))
+    return s
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+# --- error handling ---------------------------------------------------------
+
+RETRY = "retry"          # transient: back off and try the same model again
+QUOTA = "quota"          # rate limited: back off; fail over once retries run out
+FAILOVER = "failover"    # this model can't serve the request: switch immediately
+FATAL = "fatal"          # the request itself is bad: don't retry anywhere
+
+_TRANSIENT_NAMES = {"ServiceUnavailable", "InternalServerError", "DeadlineExceeded", "GatewayTimeout",
+                    "TimeoutError", "ConnectionError", "RemoteDisconnected", "Aborted", "Cancelled"}
+_FAILOVER_NAMES = {"NotFound", "PermissionDenied", "Unauthenticated", "FailedPrecondition"}
+# transport/API libraries whose otherwise unrecognised errors are worth a retry
+_NETWORK_MODULES = ("google.api_core", "google.auth.exceptions", "grpc", "httpx", "httpcore",
+                    "aiohttp", "urllib3", "requests", "http.client", "ssl", "socket")
+
+
+def classify(e: BaseException) -> str:
+    names = {c.__name__ for c in type(e).__mro__}
+    code = getattr(e, "code", None)
+    code = int(code) if isinstance(code, int) else None
+    if "ResourceExhausted" in names or "TooManyRequests" in names or code == 429:
+        return QUOTA
+    if names & _FAILOVER_NAMES or code in (401, 403, 404):
+        return FAILOVER
+    if names & _TRANSIENT_NAMES or (code is not None and code >= 500) or isinstance(e, (TimeoutError, ConnectionError)):
+        return RETRY
+    if code is not None and 400 <= code < 500:
+        return FATAL
+    # missing API key (RuntimeError), blocked response (ValueError from .text),
+    # bugs: retrying won't change the outcome
+    if isinstance(e, OSError) or any(c.__module__.startswith(_NETWORK_MODULES) for c in type(e).__mro__):
+        return RETRY
+    return FATAL
+
+
+def backoff(attempt: int) -> float:
+    return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt)))
+
+
+# --- calls ------------------------------------------------------------------
+
+def _record_usage(model: str, prompt_tokens: int, resp: Any, raw: str) -> None:
+    usage = getattr(resp, "usage_metadata", None)
+    sent = getattr(usage, "prompt_token_count", None) or prompt_tokens
+    got = getattr(usage, "candidates_token_count", None) or (estimate_tokens(raw) if raw else 0)
+    _limits(model)[1].debit(sent + got - prompt_tokens - LLM_EXPECTED_OUTPUT_TOKENS)
+    inc("civic_llm_calls_total", model=model, outcome="ok")
+    inc("civic_llm_tokens_total", sent, model=model, direction="prompt")
+    inc("civic_llm_tokens_total", got, model=model, direction="output")
+
+
+async def _throttle(model: str, tokens: int) -> None:
+    rpm, tpm = _limits(model)
+    waited = await rpm.acquire(1)
+    waited += await tpm.acquire(tokens + LLM_EXPECTED_OUTPUT_TOKENS)
+    if waited:
+        inc("civic_llm_throttled_seconds_total", waited, model=model)
+
+
+async def _call_once(get_model: ModelFactory, model: str, prompt: str) -> Tuple[Any, str]:
+    tokens = estimate_tokens(prompt)
+    await _throttle(model, tokens)
+    m = get_model(model)
+    async with _slot():
+        with span("llm", model=model):
+            if LLM_ASYNC and hasattr(m, "generate_content_async"):
+                call = m.generate_content_async(prompt)
+            else:
+                call = asyncio.to_thread(m.generate_content, prompt)
+            resp = await asyncio.wait_for(call, LLM_TIMEOUT)
+    raw = (getattr(resp, "text", None) or "").strip()
+    _record_usage(model, tokens, resp, raw)
+    return resp, raw
+
+
+async def generate(prompt: str, models: List[str], get_model: ModelFactory) -> Tuple[str, str]:
+    """Run prompt on the first model that answers; returns (raw text, model used)."""
+    last: Optional[BaseException] = None
+    for model in dict.fromkeys(m for m in models if m):
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            try:
+                _, raw = await _call_once(get_model, model, prompt)
+                return raw, model
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                last = e
+                kind = classify(e)
+                inc("civic_llm_calls_total", model=model, outcome=kind)
+                if kind == FATAL:
+                    raise
+                if kind == FAILOVER or attempt == LLM_MAX_RETRIES:
+                    print(f"[llm] {model} gave up ({kind}): {e!r}")
+                    break
+                delay = backoff(attempt)
+                print(f"[llm] {model} {kind} error {e!r}; retry {attempt + 1} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+    raise last if last else RuntimeError("no model configured")
+
+
+async def stream(prompt: str, models: List[str], get_model: ModelFactory) -> AsyncIterator[str]:
+    """Like generate(), but yields text as the model produces it.
+
+    Retries and failover only happen before the first piece is yielded; an
+    error after that is raised to the caller, which has already shown output.
+    """
+    last: Optional[BaseException] = None
+    tokens = estimate_tokens(prompt)
+    for model in dict.fromkeys(m for m in models if m):
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            sent = False
+            parts: List[str] = []
+            try:
+                await _throttle(model, tokens)
+                async with _slot():
+                    with span("llm", model=model, mode="stream"):
+                        resp = await asyncio.wait_for(
+                            get_model(model).generate_content_async(prompt, stream=True), LLM_TIMEOUT)
+                        async for chunk in resp:
+                            try:
+                                piece = chunk.text or ""
+                            except ValueError:  # chunk without text parts (e.g. only a finish reason)
+                                piece = ""
+                            if piece:
+                                parts.append(piece)
+                                sent = True
+                                yield piece
+                _record_usage(model, tokens, resp, "".join(parts))
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                last = e
+                kind = classify(e)
+                inc("civic_llm_calls_total", model=model, outcome=kind)
+                if sent or kind == FATAL:
+                    raise
+                if kind == FAILOVER or attempt == LLM_MAX_RETRIES:
+                    print(f"[llm] {model} gave up ({kind}): {e!r}")
+                    break
+                delay = backoff(attempt)
+                print(f"[llm] {model} {kind} error {e!r}; retry {attempt + 1} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+    raise last if last else RuntimeError("no model configured")
+
+
+# --- local fake -------------------------------------------------------------
+
+_FAKE_DOC = re.compile(r'<doc id="(\d+)">\n(.*?)\n</doc>', re.S)
+
+
+class FakeQuotaError(Exception):
+    code = 429
+
+
+class FakeUnavailable(Exception):
+    code = 503
+
+
+class FakeModel:
+    """Deterministic stand-in for genai.GenerativeModel.
+
+    Enforces its own rpm like the real API (raising a 429-style error when
+    exceeded) and can inject transient failures, so the governor can be tuned
+    for throughput without spending quota.
+    """
+
+    def __init__(self, name: str = "fake", latency: float = 0.0, rpm: float = 0,
+                 fail_rate: float = 0.0, seed: int = 0):
+        self.name = name
+        self.latency = latency
+        self.rpm = rpm
+        self.fail_rate = fail_rate
+        self.calls = 0
+        self.quota_errors = 0
+        self.errors = 0
+        self._rng = random.Random(seed)
+        self._window: List[float] = []
+        self._lock = threading.Lock()  # called from to_thread workers
+
+    def _admit(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self.calls += 1
+            if self.rpm:
+                self._window = [t for t in self._window if now - t < 60]
+                if len(self._window) >= self.rpm:
+                    self.quota_errors += 1
+                    raise FakeQuotaError("429 quota exceeded")
+                self._window.append(now)
+            if self.fail_rate and self._rng.random() < self.fail_rate:
+                self.errors += 1
+                raise FakeUnavailable("503 model overloaded")
+
+    def _answer(self, prompt: str) -> str:
+        docs = _FAKE_DOC.findall(prompt)
+        if docs:  # batched prompt: one object per <doc>
+            payload: Any = [{"id": int(i), **self._summary(t)} for i, t in docs]
+        else:
+            payload = self._summary(prompt)
+        return json.dumps(payload)
+
+    def generate_content(self, prompt: str):
+        self._admit()
+        if self.latency:
+            time.sleep(self.latency)
+        return _FakeResponse(self._answer(prompt))
+
+    async def generate_content_async(self, prompt: str, stream: bool = False):
+        self._admit()
+        text = self._answer(prompt)
+        if not stream:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            return _FakeResponse(text)
+        return _FakeStream(text, self.latency)
+
+    @staticmethod
+    def _summary(text: str) -> Dict[str, Any]:
+        words = text.split()
+        h = hashlib.sha256(text.encode("utf-8", errors="ignore")).hexdigest()
+        return {
+            "title": f"Meeting {h[:8]}",
+            "date": "2025-10-01",
+            "location": "Council Chambers",
+            "highlights": [" ".join(words[i:i + 8]) for i in range(20, 60, 10)],
+            "why_matters": " ".join(words[-25:]),
+        }
+
+
+class _FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+        self.usage_metadata = None
+
+
+class _FakeStream:
+    # async iterator of chunks spread over `latency`, like a streamed response
+    def __init__(self, text: str, latency: float, pieces: int = 8):
+        step = max(1, -(-len(text) // pieces))
+        self._chunks = [text[i:i + step] for i in range(0, len(text), step)]
+        self._delay = latency / max(1, len(self._chunks))
+        self.text = text
+        self.usage_metadata = None
+
+    async def __aiter__(self):
+        for c in self._chunks:
+            if self._delay:
+                await asyncio.sleep(self._delay)
+            yield _FakeResponse(c)
+
+
+def fake_model_factory(**kwargs: Any) -> ModelFactory:
+    """get_model replacement: one FakeModel per model name, all sharing kwargs."""
+    models: Dict[str, FakeModel] = {}
+
+    def get_model(name: Optional[str] = None) -> FakeModel:
+        key = name or "fake"
+        if key not in models:
+            models[key] = FakeModel(name=key, **kwargs)
+        return models[key]
+
+    get_model.models = models  # type: ignore[attr-defined]
+    return get_model
@@ -0,0 +1,128 @@
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, Tuple, Optional, Iterator, Any, List
+
+# In-process metrics, rendered in Prometheus text format at /metrics.
+#   span("fetch", host=...)        times a stage -> civic_stage_seconds histogram
+#   inc("civic_fetch_bytes_total", n, host=...)   counters
+# A run started with start_run() also collects a per-stage breakdown of the
+# spans recorded inside it (including tasks and threads it spawns).
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+_lock = threading.Lock()
+_counters: Dict[str, Dict[Labels, float]] = {}
+_hist: Dict[Labels, List[float]] = {}      # labels -> bucket counts + [sum, count]
+_run: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar("civic_run", default=None)
+
+HELP = {
+    "civic_stage_seconds": "Time spent per pipeline stage.",
+    "civic_fetch_bytes_total": "Response bytes downloaded.",
+    "civic_http_requests_total": "HTTP requests by host and status.",
+    "civic_pdf_pages_total": "PDF pages parsed.",
+    "civic_llm_tokens_total": "Tokens sent to (prompt) and received from (output) the model.",
+    "civic_llm_calls_total": "Model calls by outcome.",
+    "civic_summary_cache_total": "Summary cache lookups by result.",
+    "civic_docs_saved_total": "Documents written to civic_docs.",
+}
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+def inc(name: str, value: float = 1, **labels: Any) -> None:
+    key = _labels(labels)
+    run = _run.get()
+    with _lock:
+        series = _counters.setdefault(name, {})
+        series[key] = series.get(key, 0) + value
+        if run is not None:
+            run["counters"][name] = run["counters"].get(name, 0) + value
+
+
+def observe(stage: str, seconds: float, **labels: Any) -> None:
+    key = _labels({"stage": stage, **labels})
+    run = _run.get()
+    with _lock:
+        h = _hist.get(key)
+        if h is None:
+            h = _hist[key] = [0.0] * (len(BUCKETS) + 2)
+        for i, b in enumerate(BUCKETS):
+            if seconds <= b:
+                h[i] += 1
+        h[-2] += seconds
+        h[-1] += 1
+        if run is not None:
+            s = run["stages"].setdefault(stage, {"seconds": 0.0, "count": 0})
+            s["seconds"] += seconds
+            s["count"] += 1
+
+
+@contextmanager
+def span(stage: str, **labels: Any) -> Iterator[None]:
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - t, **labels)
+
+
+def start_run() -> contextvars.Token:
+    run = {"started": time.perf_counter(), "stages": {}, "counters": {}}
+    return _run.set(run)
+
+
+def finish_run(token: contextvars.Token) -> Dict[str, Any]:
+    """Per-stage totals for the run. Stages overlap in the pipeline, so their sum can exceed wall time."""
+    run = _run.get() or {}
+    _run.reset(token)
+    return {
+        "wall_seconds": round(time.perf_counter() - run.get("started", time.perf_counter()), 3),
+        "stages": {k: {"seconds": round(v["seconds"], 3), "count": v["count"]}
+                   for k, v in sorted(run.get("stages", {}).items())},
+        "counters": {k: round(v, 3) for k, v in sorted(run.get("counters", {}).items())},
+    }
+
+
+def _fmt_labels(labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    items = labels + extra
+    if not items:
+        return ""
+    esc = lambda v: v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in items) + "}"
+
+
+def render() -> str:
+    lines: List[str] = []
+    with _lock:
+        counters = {n: dict(s) for n, s in _counters.items()}
+        hist = {k: list(v) for k, v in _hist.items()}
+
+    for name in sorted(counters):
+        if name in HELP:
+            lines.append(f"# HELP {name} {HELP[name]}")
+        lines.append(f"# TYPE {name} counter")
+        for labels, v in sorted(counters[name].items()):
+            lines.append(f"{name}{_fmt_labels(labels)} {v:g}")
+
+    if hist:
+        name = "civic_stage_seconds"
+        lines.append(f"# HELP {name} {HELP[name]}")
+        lines.append(f"# TYPE {name} histogram")
+        for labels, h in sorted(hist.items()):
+            for i, b in enumerate(BUCKETS):
+                lines.append(f"{name}_bucket{_fmt_labels(labels, (('le', f'{b:g}'),))} {h[i]:g}")
+            lines.append(f"{name}_bucket{_fmt_labels(labels, (('le', '+Inf'),))} {h[-1]:g}")
+            lines.append(f"{name}_sum{_fmt_labels(labels)} {h[-2]:.6f}")
+            lines.append(f"{name}_count{_fmt_labels(labels)} {h[-1]:g}")
+    return "\n".join(lines) + "\n"
+
+
+def reset() -> None:
+    with _lock:
+        _counters.clear()
+        _hist.clear()
@@ -0,0 +1,50 @@
+# Runs inside the PDF process pool; keep imports light so workers start fast.
+import io
+from typing import Iterator, Union, Tuple
+import pdfplumber
+
+PdfSource = Union[bytes, str]  # raw bytes or a path on disk
+
+
+def init_worker(max_memory_mb: int) -> None:
+    if max_memory_mb <= 0:
+        return
+    try:
+        import resource
+        limit = max_memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except Exception as e:  # not available on every platform
+        print(f"[extract] Could not set PDF worker memory limit: {e!r}")
+
+
+def iter_pdf_pages(source: PdfSource, max_pages: int = 0) -> Iterator[str]:
+    # a path lets pdfminer seek in the file instead of holding the whole body
+    fp = io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+    with pdfplumber.open(fp) as pdf:
+        for i, page in enumerate(pdf.pages):
+            if max_pages and i >= max_pages:
+                break
+            try:
+                yield page.extract_text() or ""
+            finally:
+                # drop parsed layout objects so memory stays flat across pages
+                close = getattr(page, "close", None) or getattr(page, "flush_cache", None)
+                if close:
+                    close()
+
+
+def pdf_text(source: PdfSource, max_pages: int = 0, max_chars: int = 0) -> Tuple[str, int]:
+    # (text, pages parsed)
+    pages = []
+    total = 0
+    it = iter_pdf_pages(source, max_pages)
+    try:
+        for text in it:
+            pages.append(text)
+            total += len(text) + 1
+            if max_chars and total >= max_chars:
+                break  # the summarizer would cut the rest anyway
+    finally:
+        it.close()
+    # form feed between pages so the summarizer can chunk on page boundaries
+    return "\f".join(pages), len(pages)
@@ -0,0 +1,88 @@
+import os
+import asyncio
+from typing import List, Dict, Any, AsyncIterator, Tuple, Optional
+
+from .coordinator import fetch_link, extract_link, summarize_link, unchanged_link
+
+# Each stage gets its own worker count: fetch is network bound, extract is
+# CPU bound (pdfplumber), summarize is bound by the LLM quota.
+FETCH_CONCURRENCY = int(os.getenv("CIVIC_FETCH_CONCURRENCY", "8"))
+EXTRACT_CONCURRENCY = int(os.getenv("CIVIC_EXTRACT_CONCURRENCY", "2"))
+SUMMARIZE_CONCURRENCY = int(os.getenv("CIVIC_SUMMARIZE_CONCURRENCY", "4"))
+QUEUE_SIZE = int(os.getenv("CIVIC_PIPELINE_QUEUE_SIZE", "16"))
+
+
+def _error(url: str, e: BaseException) -> Dict[str, Any]:
+    return {"source_url": url, "error": str(e)}
+
+
+async def iter_pipeline(urls: List[str], user_id: str = "demo",
+                        city: Optional[str] = None) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+    """Yield (index, result) pairs as each URL finishes, in completion order."""
+    if not urls:
+        return
+
+    to_fetch: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+    to_extract: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+    to_summarize: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+    done: asyncio.Queue = asyncio.Queue()
+
+    async def feed():
+        for i, u in enumerate(urls):
+            await to_fetch.put((i, u))
+
+    async def fetcher():
+        while True:
+            i, u = await to_fetch.get()
+            try:
+                fetched = await fetch_link(u)
+            except Exception as e:
+                await done.put((i, _error(u, e)))
+                continue
+            if fetched is None:
+                try:
+                    result = await unchanged_link(u, user_id=user_id, city=city)
+                except Exception as e:
+                    result = _error(u, e)
+                await done.put((i, result))
+                continue
+            await to_extract.put((i, u, *fetched))
+
+    async def extractor():
+        while True:
+            i, u, data, ctype, validators = await to_extract.get()
+            try:
+                text = await extract_link(u, data, ctype)
+            except Exception as e:
+                await done.put((i, _error(u, e)))
+                continue
+            await to_summarize.put((i, u, text, validators))
+
+    async def summarizer():
+        while True:
+            i, u, text, validators = await to_summarize.get()
+            try:
+                item = await summarize_link(u, text, user_id=user_id, validators=validators, city=city)
+            except Exception as e:
+                item = _error(u, e)
+            await done.put((i, item))
+
+    tasks = [asyncio.create_task(feed())]
+    tasks += [asyncio.create_task(fetcher()) for _ in range(max(1, FETCH_CONCURRENCY))]
+    tasks += [asyncio.create_task(extractor()) for _ in range(max(1, EXTRACT_CONCURRENCY))]
+    tasks += [asyncio.create_task(summarizer()) for _ in range(max(1, SUMMARIZE_CONCURRENCY))]
+    try:
+        for _ in range(len(urls)):
+            yield await done.get()
+    finally:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def run_pipeline(urls: List[str], user_id: str = "demo", city: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Process every URL through the staged pipeline; results keep discovery order."""
+    results: List[Dict[str, Any]] = [{} for _ in urls]
+    async for i, item in iter_pipeline(urls, user_id=user_id, city=city):
+        results[i] = item
+    return results
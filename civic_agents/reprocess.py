@@ -0,0 +1,85 @@
+import sys
+import json
+import time
+import asyncio
+import argparse
+from typing import List, Dict, Any, Optional
+
+from .summarizer import summarize_text
+from .extract import extract_text_from_bytes, shutdown_pdf_pool
+from .coordinator import _map_to_civicdoc
+from .pipeline import SUMMARIZE_CONCURRENCY
+from storage.artifacts import link_artifacts, load_text, get_artifact, save_link_artifacts, artifact_stats
+from storage.feed import save_doc_async, shared_doc_cities
+
+# Offline re-summarization from the artifact store: no fetching, and with the
+# stored text no PDF parsing either. Useful after changing the prompt or
+# GEMINI_MODEL; summaries whose (model, prompt version, text) is unchanged come
+# straight from the summary cache.
+#   python -m civic_agents.reprocess [--re-extract] [--url URL ...] [--limit N]
+
+
+async def reprocess_link(ref: Dict[str, Any], re_extract: bool = False) -> Dict[str, Any]:
+    url = ref["url"]
+    owners = await asyncio.to_thread(shared_doc_cities, url)
+    if not owners:
+        return {"source_url": url, "status": "skipped", "reason": "no shared doc for this url"}
+
+    text = None if re_extract else await asyncio.to_thread(load_text, ref["text_digest"])
+    if text is None:
+        raw = await asyncio.to_thread(get_artifact, ref["raw_digest"])
+        if raw is None:
+            return {"source_url": url, "status": "missing", "reason": "artifacts were evicted"}
+        text = await extract_text_from_bytes(raw, ref["content_type"])
+        await asyncio.to_thread(save_link_artifacts, url, raw, ref["content_type"], text)
+
+    item = await summarize_text(text, source_url=url, batch=True)
+    for user_id, city in owners:
+        await save_doc_async(_map_to_civicdoc(item, url, user_id, city))
+    return {"source_url": url, "status": "ok", "title": item.get("title"), "docs": len(owners)}
+
+
+async def reprocess(urls: Optional[List[str]] = None, re_extract: bool = False,
+                    limit: Optional[int] = None, concurrency: int = SUMMARIZE_CONCURRENCY) -> List[Dict[str, Any]]:
+    refs = list(link_artifacts(urls))[:limit]
+    sem = asyncio.Semaphore(max(1, concurrency))
+
+    async def one(ref: Dict[str, Any]) -> Dict[str, Any]:
+        async with sem:
+            try:
+                return await reprocess_link(ref, re_extract)
+            except Exception as e:
+                return {"source_url": ref["url"], "error": repr(e)}
+
+    return await asyncio.gather(*(one(r) for r in refs))
+
+
+async def _main(args: argparse.Namespace) -> int:
+    t = time.perf_counter()
+    try:
+        results = await reprocess(args.url or None, args.re_extract, args.limit, args.concurrency)
+    finally:
+        shutdown_pdf_pool()
+    for r in results:
+        print(json.dumps(r, ensure_ascii=False))
+    tally: Dict[str, int] = {}
+    for r in results:
+        key = "error" if "error" in r else r["status"]
+        tally[key] = tally.get(key, 0) + 1
+    print(f"[reprocess] {len(results)} urls in {time.perf_counter() - t:.1f}s: {tally}")
+    print(f"[reprocess] artifacts: {artifact_stats()}")
+    return 1 if tally.get("error") else 0
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    p = argparse.ArgumentParser(description="Re-summarize stored documents without downloading them again.")
+    p.add_argument("--url", action="append", help="only this url (repeatable)")
+    p.add_argument("--re-extract", action="store_true", help="parse the stored raw bodies again instead of reusing their text")
+    p.add_argument("--limit", type=int, default=None)
+    p.add_argument("--concurrency", type=int, default=SUMMARIZE_CONCURRENCY)
+    try:
+        sys.exit(asyncio.run(_main(p.parse_args())))
+    except KeyboardInterrupt:
+        sys.exit(130)
@@ -0,0 +1,160 @@
+import os
+import sys
+import json
+import math
+import asyncio
+import argparse
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+
+from . import http_client
+from .discovery import discover_sources_from, page_key
+from .city_registry import city_sources
+from .pipeline import run_pipeline
+from .extract import shutdown_pdf_pool
+from storage.fetch_meta import change_rates
+from storage.subscriptions import subscriber_counts, city_run_times, record_city_run
+
+# Background crawler: keeps every city in city_sources.json fresh so user
+# runs are answered from shared docs. Busy cities (many subscribers, sources
+# that change often) are revisited sooner than quiet ones.
+CRAWL_INTERVAL = float(os.getenv("CIVIC_CRAWL_INTERVAL", str(6 * 3600)))
+CRAWL_MIN_INTERVAL = float(os.getenv("CIVIC_CRAWL_MIN_INTERVAL", "1800"))
+CRAWL_MAX_INTERVAL = float(os.getenv("CIVIC_CRAWL_MAX_INTERVAL", str(24 * 3600)))
+CRAWL_TICK = float(os.getenv("CIVIC_CRAWL_TICK", "60"))
+CRAWL_CITY_CONCURRENCY = int(os.getenv("CIVIC_CRAWL_CITY_CONCURRENCY", "2"))
+CRAWL_HOST_DELAY = float(os.getenv("CIVIC_CRAWL_HOST_DELAY", "2"))
+CRAWL_LIMIT_PER_SITE = int(os.getenv("CIVIC_CRAWL_LIMIT_PER_SITE", "10"))
+SCHEDULER_USER = "scheduler"
+
+_task: Optional[asyncio.Task] = None
+
+
+def _age_seconds(finished_at: Optional[str], now: datetime) -> float:
+    if not finished_at:
+        return math.inf
+    try:
+        return (now - datetime.fromisoformat(finished_at)).total_seconds()
+    except ValueError:
+        return math.inf
+
+
+def plan(now: Optional[datetime] = None) -> List[Tuple[float, str, List[str]]]:
+    """Cities that are due, highest priority first, as (priority, city, seeds)."""
+    now = now or datetime.utcnow()
+    sources = city_sources()
+    subs = subscriber_counts()
+    last = city_run_times()
+    rates = change_rates([page_key(u) for seeds in sources.values() for u in seeds])
+
+    due = []
+    for city, seeds in sources.items():
+        if not seeds:
+            continue
+        n = subs.get(city, 0)
+        known = [rates[page_key(u)] for u in seeds if page_key(u) in rates]
+        rate = sum(known) / len(known) if known else 0.5  # unknown history: assume average
+        interval = CRAWL_INTERVAL / (math.sqrt(1 + n) * (0.5 + rate))
+        interval = min(max(interval, CRAWL_MIN_INTERVAL), CRAWL_MAX_INTERVAL)
+        age = _age_seconds(last.get(city), now)
+        if age < interval:
+            continue
+        overdue = 10.0 if math.isinf(age) else age / interval
+        due.append((overdue * (1 + math.log1p(n)) * (0.5 + rate), city, seeds))
+    due.sort(key=lambda x: x[0], reverse=True)
+    return due
+
+
+async def crawl_city(city: str, seeds: List[str], limit_per_site: int = CRAWL_LIMIT_PER_SITE) -> Dict[str, Any]:
+    urls = await discover_sources_from(seeds, limit_per_site=limit_per_site)
+    results = await run_pipeline(urls, user_id=SCHEDULER_USER, city=city)
+    summary = {
+        "seeds_used": seeds,
+        "discovered": len(results),
+        "ok": sum(1 for r in results if "error" not in r and r.get("status") not in ("unchanged", "duplicate")),
+        "unchanged": sum(1 for r in results if r.get("status") == "unchanged"),
+        "duplicates": sum(1 for r in results if r.get("status") == "duplicate"),
+        "errors": [r for r in results if "error" in r][:5],
+        "preview": [
+            {"title": r.get("title"), "source_url": r.get("source_url")}
+            for r in results if "error" not in r and not r.get("status")
+        ][:8],
+        "scheduled": True,
+    }
+    await asyncio.to_thread(record_city_run, city, seeds, summary)
+    return summary
+
+
+async def crawl_once(max_cities: Optional[int] = None) -> List[Dict[str, Any]]:
+    todo = (await asyncio.to_thread(plan))[:max_cities]
+    if not todo:
+        return []
+    token = http_client.politeness(CRAWL_HOST_DELAY)
+    sem = asyncio.Semaphore(max(1, CRAWL_CITY_CONCURRENCY))
+
+    async def one(city: str, seeds: List[str]) -> Dict[str, Any]:
+        async with sem:
+            try:
+                summary = await crawl_city(city, seeds)
+                print(f"[scheduler] {city}: {summary['ok']} new, {summary['unchanged']} unchanged")
+                return {"city": city, **summary}
+            except Exception as e:
+                print(f"[scheduler] {city} failed: {e!r}")
+                return {"city": city, "error": str(e)}
+
+    try:
+        return await asyncio.gather(*(one(city, seeds) for _, city, seeds in todo))
+    finally:
+        http_client.reset_politeness(token)
+
+
+async def crawl_forever(tick: float = CRAWL_TICK) -> None:
+    while True:
+        try:
+            await crawl_once(max_cities=max(1, CRAWL_CITY_CONCURRENCY) * 2)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[scheduler] Crawl pass failed: {e!r}")
+        await asyncio.sleep(tick)
+
+
+def start_scheduler() -> None:
+    global _task
+    if _task is None or _task.done():
+        _task = asyncio.create_task(crawl_forever())
+
+
+async def stop_scheduler() -> None:
+    global _task
+    if _task is not None:
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
+    _task = None
+
+
+async def _main(args: argparse.Namespace) -> None:
+    await http_client.start_client()
+    try:
+        if args.once:
+            for r in await crawl_once(max_cities=args.max_cities):
+                print(json.dumps(r, ensure_ascii=False))
+        else:
+            await crawl_forever(tick=args.tick)
+    finally:
+        await http_client.close_client()
+        shutdown_pdf_pool()
+
+
+if __name__ == "__main__":
+    # python -m civic_agents.scheduler [--once] [--max-cities N]
+    from dotenv import load_dotenv
+    load_dotenv()
+    p = argparse.ArgumentParser(description="Crawl every city in city_sources.json on a schedule.")
+    p.add_argument("--once", action="store_true", help="run one pass over due cities and exit")
+    p.add_argument("--max-cities", type=int, default=None)
+    p.add_argument("--tick", type=float, default=CRAWL_TICK, help="seconds between passes")
+    try:
+        asyncio.run(_main(p.parse_args()))
+    except KeyboardInterrupt:
+        sys.exit(0)
@@ -1,19 +1,69 @@
-import os, json, asyncio
+import os, re, json, asyncio, hashlib
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, Tuple, AsyncIterator
 from dotenv import load_dotenv
 import google.generativeai as genai
 
+from storage.cache import cache_get, cache_put
+from .metrics import span, inc
+from . import llm
+
+# texts up to MAX_CHARS are summarized in one call; longer ones are split into
+# SUMMARY_CHUNK_CHARS chunks on page/paragraph boundaries, summarized
+# concurrently (map) and merged in a final call (reduce)
 MAX_CHARS = 100_000
+SUMMARY_CHUNKED = os.getenv("CIVIC_SUMMARY_CHUNKED", "1") == "1"
+SUMMARY_CHUNK_CHARS = int(os.getenv("CIVIC_SUMMARY_CHUNK_CHARS", "50000"))
+SUMMARY_MAX_CHUNKS = int(os.getenv("CIVIC_SUMMARY_MAX_CHUNKS", "8"))
+# longest text summarize_text will look at; extraction stops at the same budget
+DOC_MAX_CHARS = max(MAX_CHARS, SUMMARY_CHUNK_CHARS * SUMMARY_MAX_CHUNKS) if SUMMARY_CHUNKED else MAX_CHARS
+PAGE_BREAK = "\f"  # pdf_worker joins pages with this
+# bump whenever the system instruction or prompt template changes so old
+# cached summaries stop matching
+PROMPT_VERSION = "v1"
+
+# Short texts (notices, one-page agendas) are summarized several per request:
+# they queue for up to SUMMARY_BATCH_DELAY and go out together as long as the
+# batch stays under SUMMARY_BATCH_TOKENS. Anything larger is sent alone. Only
+# pipeline callers (batch=True) start a batch; a one-off request joins one
+# that is already waiting and is otherwise sent right away.
+SUMMARY_BATCH = os.getenv("CIVIC_SUMMARY_BATCH", "1") == "1"
+SUMMARY_BATCH_DOC_TOKENS = int(os.getenv("CIVIC_SUMMARY_BATCH_DOC_TOKENS", "1500"))
+SUMMARY_BATCH_TOKENS = int(os.getenv("CIVIC_SUMMARY_BATCH_TOKENS", "8000"))
+SUMMARY_BATCH_MAX_DOCS = int(os.getenv("CIVIC_SUMMARY_BATCH_MAX_DOCS", "8"))
+SUMMARY_BATCH_DELAY = float(os.getenv("CIVIC_SUMMARY_BATCH_DELAY", "0.25"))
+
+def _model_name() -> str:
+    return os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+
+def _cache_key(text: str, model_name: str) -> str:
+    norm = re.sub(r"\s+", " ", text or "").strip()
+    h = hashlib.sha256()
+    for part in (model_name, PROMPT_VERSION, norm):
+        h.update(part.encode("utf-8", errors="ignore"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+_models: Dict[str, Any] = {}
+# CIVIC_LLM_FAKE=1 runs against llm.FakeModel (local dev, benchmarks)
+_fake_factory = llm.fake_model_factory() if os.getenv("CIVIC_LLM_FAKE") == "1" else None
 
 def _get_model(model_name: Optional[str] = None):
+    name = model_name or _model_name()
+    if _fake_factory:
+        return _fake_factory(name)
+    model = _models.get(name)
+    if model is None:
+        model = _models[name] = _build_model(name)
+    return model
+
+def _build_model(name: str):
     load_dotenv()
     api_key = os.getenv("GOOGLE_API_KEY")
     if not api_key:
         raise RuntimeError("Missing GOOGLE_API_KEY in environment (.env)")
     genai.configure(api_key=api_key)
 
-    name = model_name or os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
     return genai.GenerativeModel(
         model_name=name,
         system_instruction=(
@@ -27,41 +77,312 @@ def _get_model(model_name: Optional[str] = None):
         },
     )
 
-async def summarize_text(text: str, source_url: Optional[str] = None) -> Dict[str, Any]:
-    prompt = (
-        "Return JSON with keys: title, date, location, highlights (list), why_matters.\n"
-        "Text to summarize:\n" + (text or "")[:MAX_CHARS]
+async def summarize_text(text: str, source_url: Optional[str] = None, batch: bool = False) -> Dict[str, Any]:
+    text = (text or "")[:DOC_MAX_CHARS]
+    model = _model_name()
+    with span("summarize", model=model):
+        key = _cache_key(text, model)
+        payload = await asyncio.to_thread(cache_get, key)
+        inc("civic_summary_cache_total", model=model, result="miss" if payload is None else "hit")
+        if payload is None:
+            payload, parsed = await _generate(text, batch)
+            if parsed:
+                await asyncio.to_thread(
+                    cache_put, key, model, PROMPT_VERSION, payload, len(text.encode("utf-8", errors="ignore"))
+                )
+    return _item(payload, text, source_url)
+
+def _item(payload: Dict[str, Any], text: str, source_url: Optional[str]) -> Dict[str, Any]:
+    return {
+        "title": payload.get("title") or "Civic Update",
+        "date": payload.get("date") or datetime.utcnow().date().isoformat(),
+        "location": payload.get("location"),
+        "highlights": payload.get("highlights") or [],
+        "why_matters": payload.get("why_matters"),
+        "source_url": source_url,
+        "created_at": datetime.utcnow().isoformat() + "Z",
+        "entities": [],
+        "body": text[:4000],
+    }
+
+async def _generate(text: str, batch: bool = False) -> tuple[Dict[str, Any], bool]:
+    if (SUMMARY_BATCH and llm.estimate_tokens(text) <= SUMMARY_BATCH_DOC_TOKENS
+            and (batch or _loop_batch()["items"])):
+        return await _generate_batched(text)
+    if SUMMARY_CHUNKED and len(text) > MAX_CHARS:
+        return await _generate_chunked(text)
+    return await _generate_one(text[:MAX_CHARS])
+
+def _prompt(text: str, intro: str = "") -> str:
+    return (
+        intro + "Return JSON with keys: title, date, location, highlights (list), why_matters.\n"
+        "Text to summarize:\n" + text
     )
-    model = _get_model()
 
-    try:
-        resp = await asyncio.to_thread(model.generate_content, prompt)
-        raw = (getattr(resp, "text", None) or "").strip()
-    except Exception as e:
-        # try fallback model from env
-        fb = os.getenv("GEMINI_FALLBACK_MODEL", "gemini-1.5-flash")
-        print("Gemini call failed on primary:", repr(e), " → trying fallback:", fb)
-        resp = await asyncio.to_thread(_get_model(fb).generate_content, prompt)
-        raw = (getattr(resp, "text", None) or "").strip()
+async def _generate_one(text: str, intro: str = "") -> tuple[Dict[str, Any], bool]:
+    # rate limits, retries and failover to the fallback model live in llm.generate
+    models = [_model_name(), os.getenv("GEMINI_FALLBACK_MODEL", "gemini-1.5-flash")]
+    raw, _ = await llm.generate(_prompt(text, intro), models, lambda name: _get_model(name))
+    return _parse(raw)
 
+def _parse(raw: str) -> tuple[Dict[str, Any], bool]:
     try:
         payload = json.loads(raw)
+        if not isinstance(payload, dict):
+            raise ValueError("expected a JSON object")
+        return payload, True
     except Exception:
-        payload = {
+        return {
             "title": (raw.split("\n")[0] or "Civic Update").strip(),
             "date": None, "location": None,
             "highlights": [ln.strip("- •") for ln in raw.split("\n")[:5] if ln.strip()],
             "why_matters": raw,
-        }
+        }, False
+
+
+# --- streaming ---------------------------------------------------------------
+# stream_summary yields ("title", str) and ("highlight", str) as soon as they
+# are complete in the partial JSON, then ("item", item) once it parses.
+
+_JSON_STR = r'"((?:[^"\\]|\\.)*)"'
+_TITLE = re.compile(r'"title"\s*:\s*' + _JSON_STR)
+_HIGHLIGHTS = re.compile(r'"highlights"\s*:\s*\[')
+_NEXT_STR = re.compile(r'\s*,?\s*' + _JSON_STR)
+
+def _unescape(s: str) -> str:
+    try:
+        return json.loads(f'"{s}"')
+    except ValueError:
+        return s
+
+def partial_fields(buf: str) -> Tuple[Optional[str], List[str]]:
+    """Title and the highlights that are already complete in a partial JSON answer."""
+    m = _TITLE.search(buf)
+    title = _unescape(m.group(1)) if m else None
+    highlights: List[str] = []
+    m = _HIGHLIGHTS.search(buf)
+    if m:
+        pos = m.end()
+        while (h := _NEXT_STR.match(buf, pos)):
+            highlights.append(_unescape(h.group(1)))
+            pos = h.end()
+    return title, highlights
+
+async def stream_summary(text: str, source_url: Optional[str] = None) -> AsyncIterator[Tuple[str, Any]]:
+    text = (text or "")[:DOC_MAX_CHARS]
+    model = _model_name()
+    key = _cache_key(text, model)
+    payload = await asyncio.to_thread(cache_get, key)
+    inc("civic_summary_cache_total", model=model, result="miss" if payload is None else "hit")
+    if payload is None and len(text) <= MAX_CHARS:
+        models = [model, os.getenv("GEMINI_FALLBACK_MODEL", "gemini-1.5-flash")]
+        buf, title, sent = "", None, 0
+        with span("summarize", model=model, mode="stream"):
+            async for piece in llm.stream(_prompt(text), models, lambda name: _get_model(name)):
+                buf += piece
+                t, highlights = partial_fields(buf)
+                if t is not None and title is None:
+                    title = t
+                    yield "title", t
+                for h in highlights[sent:]:
+                    yield "highlight", h
+                sent = max(sent, len(highlights))
+        payload, parsed = _parse(buf.strip())
+        if parsed:
+            await asyncio.to_thread(
+                cache_put, key, model, PROMPT_VERSION, payload, len(text.encode("utf-8", errors="ignore"))
+            )
+        yield "item", _item(payload, text, source_url)
+        return
+
+    # cache hit, or a long document that needs map-reduce: only the finished item can be sent
+    item = _item(payload, text, source_url) if payload is not None else await summarize_text(text, source_url)
+    yield "title", item["title"]
+    for h in item["highlights"]:
+        yield "highlight", h
+    yield "item", item
 
+
+# pending batch per event loop: {"loop", "items": [(text, future)], "tokens", "handle"};
+# a timer or future from one loop must never be used from another
+_batches: Dict[int, Dict[str, Any]] = {}
+_batch_tasks: set = set()
+
+def _loop_batch() -> Dict[str, Any]:
+    loop = asyncio.get_running_loop()
+    b = _batches.get(id(loop))
+    if b is None or b["loop"] is not loop:
+        for k, old in list(_batches.items()):
+            if old["loop"].is_closed():
+                del _batches[k]
+        b = _batches[id(loop)] = {"loop": loop, "items": [], "tokens": 0, "handle": None}
+    return b
+
+def _schedule_batch(b: Dict[str, Any]) -> None:
+    if b["handle"] is not None:
+        b["handle"].cancel()
+        b["handle"] = None
+    batch, b["items"], b["tokens"] = b["items"], [], 0
+    if batch:
+        t = asyncio.create_task(_run_batch(batch))
+        _batch_tasks.add(t)
+        t.add_done_callback(_batch_tasks.discard)
+
+async def _generate_batched(text: str) -> tuple[Dict[str, Any], bool]:
+    b = _loop_batch()
+    tokens = llm.estimate_tokens(text)
+    if b["items"] and b["tokens"] + tokens > SUMMARY_BATCH_TOKENS:
+        _schedule_batch(b)
+    fut = b["loop"].create_future()
+    b["items"].append((text, fut))
+    b["tokens"] += tokens
+    if len(b["items"]) >= SUMMARY_BATCH_MAX_DOCS:
+        _schedule_batch(b)
+    elif b["handle"] is None:
+        b["handle"] = b["loop"].call_later(SUMMARY_BATCH_DELAY, _schedule_batch, b)
+    return await fut
+
+def _batch_prompt(texts: List[str]) -> str:
+    docs = "\n".join(f'<doc id="{i}">\n{t}\n</doc>' for i, t in enumerate(texts, 1))
+    return (
+        f"Summarize each of the {len(texts)} documents below separately.\n"
+        "Return a JSON array with one object per document, in the same order, each with keys: "
+        "id (the doc id), title, date, location, highlights (list), why_matters.\n"
+        "Documents:\n" + docs
+    )
+
+def _split_batch(raw: str, n: int) -> List[Optional[Dict[str, Any]]]:
+    out: List[Optional[Dict[str, Any]]] = [None] * n
+    try:
+        data = json.loads(raw)
+    except Exception:
+        return out
+    if isinstance(data, dict):
+        data = data.get("documents") or data.get("items") or []
+    if not isinstance(data, list):
+        return out
+    for pos, item in enumerate(data):
+        if not isinstance(item, dict):
+            continue
+        try:
+            i = int(item.get("id", pos + 1)) - 1
+        except (TypeError, ValueError):
+            i = pos
+        if 0 <= i < n and out[i] is None:
+            out[i] = {k: v for k, v in item.items() if k != "id"}
+    return out
+
+async def _run_batch(batch: List[Tuple[str, asyncio.Future]]) -> None:
+    texts = [t for t, _ in batch]
+    payloads: List[Optional[Dict[str, Any]]] = [None] * len(batch)
+    if len(batch) > 1:
+        models = [_model_name(), os.getenv("GEMINI_FALLBACK_MODEL", "gemini-1.5-flash")]
+        try:
+            raw, _ = await llm.generate(_batch_prompt(texts), models, lambda name: _get_model(name))
+            payloads = _split_batch(raw, len(batch))
+            inc("civic_summary_batches_total")
+            inc("civic_summary_batched_docs_total", sum(1 for p in payloads if p))
+        except Exception as e:
+            print(f"[summarizer] Batch of {len(batch)} failed, summarizing one by one: {e!r}")
+    async def settle(text: str, fut: asyncio.Future, payload: Optional[Dict[str, Any]]) -> None:
+        try:
+            # documents the batch answer didn't cover are retried on their own
+            result = (payload, True) if payload else await _generate_one(text)
+        except Exception as e:
+            if not fut.done():
+                fut.set_exception(e)
+            return
+        if not fut.done():
+            fut.set_result(result)
+
+    await asyncio.gather(*(settle(t, f, p) for (t, f), p in zip(batch, payloads)))
+
+
+def _chunks(text: str, size: int = SUMMARY_CHUNK_CHARS) -> List[str]:
+    """Split text into pieces of at most `size` chars, preferring page, then
+    paragraph, line and sentence boundaries; pages are packed together."""
+    out: List[str] = []
+    cur = ""
+    for seg in _segments(text, size, (PAGE_BREAK, "\n\n", "\n", ". ", " ")):
+        if cur and len(cur) + len(seg) > size:
+            out.append(cur)
+            cur = ""
+        cur += seg
+    if cur.strip():
+        out.append(cur)
+    return [c for c in out if c.strip()]
+
+def _segments(text: str, size: int, seps: Tuple[str, ...]) -> List[str]:
+    if len(text) <= size:
+        return [text]
+    if not seps:
+        return [text[i:i + size] for i in range(0, len(text), size)]
+    sep, rest = seps[0], seps[1:]
+    parts = text.split(sep)
+    out: List[str] = []
+    for i, part in enumerate(parts):
+        piece = part + (sep if i < len(parts) - 1 else "")
+        out.extend([piece] if len(piece) <= size else _segments(piece, size, rest))
+    return out
+
+async def _generate_chunked(text: str) -> tuple[Dict[str, Any], bool]:
+    # grow the chunk size (up to MAX_CHARS) until the text fits in SUMMARY_MAX_CHUNKS
+    size = SUMMARY_CHUNK_CHARS
+    chunks = _chunks(text, size)
+    while len(chunks) > SUMMARY_MAX_CHUNKS and size < MAX_CHARS:
+        size = min(MAX_CHARS, int(size * 1.25))
+        chunks = _chunks(text, size)
+    chunks = chunks[:SUMMARY_MAX_CHUNKS]
+    n = len(chunks)
+    inc("civic_summary_chunks_total", n)
+    # map: every chunk at once; llm.generate enforces the concurrency and rate limits
+    with span("summarize_map"):
+        results = await asyncio.gather(
+            *(_generate_one(c, f"This is part {i} of {n} of a longer document.\n") for i, c in enumerate(chunks, 1)),
+            return_exceptions=True,
+        )
+    parts = [r for r in results if not isinstance(r, BaseException)]
+    if not parts:
+        raise next(r for r in results if isinstance(r, BaseException))
+    if len(parts) < n:
+        print(f"[summarizer] {n - len(parts)} of {n} chunks failed; merging the rest")
+    parsed = len(parts) == n and all(ok for _, ok in parts)
+    if len(parts) == 1:
+        return parts[0][0], parsed
+
+    # reduce: one call merges the partial summaries into the usual schema
+    partials = [p for p, _ in parts]
+    prompt = (
+        "These are summaries of consecutive parts of one civic document, in order. Merge them into a single "
+        "summary of the whole document. Keep the items most relevant to residents (budget, zoning, votes, "
+        "public hearings) even when they appear late in the document.\n"
+        "Return JSON with keys: title, date, location, highlights (list of 3-6), why_matters.\n"
+        "Part summaries:\n" + json.dumps(partials, ensure_ascii=False)
+    )
+    models = [_model_name(), os.getenv("GEMINI_FALLBACK_MODEL", "gemini-1.5-flash")]
+    try:
+        with span("summarize_reduce"):
+            raw, _ = await llm.generate(prompt, models, lambda name: _get_model(name))
+        payload = json.loads(raw)
+        if isinstance(payload, dict):
+            return payload, parsed
+    except Exception as e:
+        print(f"[summarizer] Reduce step failed, merging chunk summaries locally: {e!r}")
+    return _merge_partials(partials), False
+
+def _merge_partials(partials: List[Dict[str, Any]]) -> Dict[str, Any]:
+    first = lambda k: next((p.get(k) for p in partials if p.get(k)), None)
+    highlights: List[str] = []
+    # round-robin so later parts are represented too
+    lists = [p.get("highlights") or [] for p in partials]
+    for i in range(max(map(len, lists), default=0)):
+        for hl in lists:
+            if i < len(hl) and hl[i] and hl[i] not in highlights:
+                highlights.append(hl[i])
     return {
-        "title": payload.get("title") or "Civic Update",
-        "date": payload.get("date") or datetime.utcnow().date().isoformat(),
-        "location": payload.get("location"),
-        "highlights": payload.get("highlights") or [],
-        "why_matters": payload.get("why_matters"),
-        "source_url": source_url,
-        "created_at": datetime.utcnow().isoformat() + "Z",
-        "entities": [],
-        "body": (text or "")[:4000],
+        "title": first("title"),
+        "date": first("date"),
+        "location": first("location"),
+        "highlights": highlights[:6],
+        "why_matters": " ".join(str(p.get("why_matters")) for p in partials[:3] if p.get("why_matters")),
     }
@@ -9,14 +9,53 @@ export default function Dashboard() {
 
   async function runAgent() {
     try {
-      setStatus("⏳ Fetching updates…");
-      const resp = await fetch("http://127.0.0.1:8000/agent/run-for-me", { method: "POST" });
-      const data = await resp.json();
-      if (typeof data.ok === "number") {
-        setStatus(data.ok > 0 ? `✅ Got ${data.ok} new updates` : "ℹ️ No new updates found");
-        if (data.ok > 0) setRefreshKey(k => k + 1);
-      } else if (data.error) setStatus(`❌ ${data.error}`);
-      else setStatus("⚠️ Unexpected response");
+      setStatus("⏳ Finding sources…");
+      const resp = await fetch("http://127.0.0.1:8000/agent/run-for-me/stream", { method: "POST" });
+      if (!resp.body) throw new Error("no stream");
+      const reader = resp.body.getReader();
+      const decoder = new TextDecoder();
+      let buf = "";
+      let total = 0, finished = 0, fresh = 0;
+
+      const handle = (event: string, data: any) => {
+        if (event === "discovery" && data.status === "done") {
+          total = data.discovered;
+          setStatus(total ? `⏳ Processing 0/${total} links…` : "ℹ️ No new updates found");
+        } else if (event === "item") {
+          finished += 1;
+          if (data.status === "ok") {
+            fresh += 1;
+            setRefreshKey(k => k + 1);
+          }
+          setStatus(`⏳ Processing ${finished}/${total} links… (${fresh} new)`);
+        } else if (event === "done") {
+          if (data.shared) {
+            setStatus("✅ Your city's updates are up to date");
+            setRefreshKey(k => k + 1);
+            return;
+          }
+          setStatus(data.ok > 0 ? `✅ Got ${data.ok} new updates` : "ℹ️ No new updates found");
+        } else if (event === "error") {
+          setStatus(`❌ ${data.error}`);
+        }
+      };
+
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buf += decoder.decode(value, { stream: true });
+        let sep;
+        while ((sep = buf.indexOf("\n\n")) >= 0) {
+          const chunk = buf.slice(0, sep);
+          buf = buf.slice(sep + 2);
+          let event = "message", data = "";
+          for (const line of chunk.split("\n")) {
+            if (line.startsWith("event: ")) event = line.slice(7);
+            else if (line.startsWith("data: ")) data += line.slice(6);
+          }
+          if (data) handle(event, JSON.parse(data));
+        }
+      }
     } catch {
       setStatus("❌ Network error");
     }
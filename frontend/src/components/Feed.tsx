@@ -4,6 +4,8 @@ import CivicUpdateCard from "./CivicUpdateCard";
 export default function Feed({ refreshKey }: { refreshKey?: number }) {
   const [items, setItems] = useState<any[]>([]);
   const [loading, setLoading] = useState(true);
+  const [cursor, setCursor] = useState<number | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   async function loadFeed() {
     try {
@@ -11,11 +13,25 @@ export default function Feed({ refreshKey }: { refreshKey?: number }) {
       const resp = await fetch("http://127.0.0.1:8000/feed");
       const data = await resp.json();
       setItems(data.items || []);
+      setCursor(data.next_cursor ?? null);
     } finally {
       setLoading(false);
     }
   }
 
+  async function loadMore() {
+    if (cursor === null) return;
+    try {
+      setLoadingMore(true);
+      const resp = await fetch(`http://127.0.0.1:8000/feed?cursor=${cursor}`);
+      const data = await resp.json();
+      setItems(prev => [...prev, ...(data.items || [])]);
+      setCursor(data.next_cursor ?? null);
+    } finally {
+      setLoadingMore(false);
+    }
+  }
+
   useEffect(() => { loadFeed(); }, [refreshKey]);
 
   if (loading) return <p className="text-slate-500">⏳ Loading feed…</p>;
@@ -23,7 +39,16 @@ export default function Feed({ refreshKey }: { refreshKey?: number }) {
 
   return (
     <div className="grid gap-5">
-      {items.map((it, i) => <CivicUpdateCard key={i} item={it} />)}
+      {items.map((it, i) => <CivicUpdateCard key={it.id ?? i} item={it} />)}
+      {cursor !== null && (
+        <button
+          onClick={loadMore}
+          disabled={loadingMore}
+          className="justify-self-center px-4 py-2 rounded-xl border border-slate-300 text-slate-700 hover:bg-slate-50"
+        >
+          {loadingMore ? "Loading…" : "Load more"}
+        </button>
+      )}
     </div>
   );
 }
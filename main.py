@@ -1,27 +1,39 @@
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
 from typing import Optional
-import os, io, re
-import httpx
-import pdfplumber
-from bs4 import BeautifulSoup
+import os, re, asyncio
 from dotenv import load_dotenv
 from datetime import datetime
 from storage.users import upsert_user, get_user
 import json, os, pathlib
 from civic_agents.discovery import discover_sources_from
-from civic_agents.coordinator import process_link   
+from civic_agents.pipeline import run_pipeline, iter_pipeline
+from civic_agents import http_client, metrics
+from civic_agents.jobs import start_workers, stop_workers, submit_job, cancel_job
+from civic_agents.scheduler import start_scheduler, stop_scheduler
+from civic_agents.city_registry import registry as city_registry, resolve_city, seeds_for_city, city_sources
+from civic_agents.geo import nearest_jurisdictions
+from storage.jobs import get_job
 from storage.users import get_user                  
 
 
 
 
-from storage import CivicDoc, save_doc, get_feed
+from storage import save_doc_async, get_feed
+from storage.db import close_all as close_db
+from storage.feed import CivicDoc
+from storage.cache import cache_stats
+from storage.artifacts import artifact_stats
+from storage.search import search_docs
+from storage.subscriptions import city_key, set_subscriptions, record_city_run, recent_city_run
+from civic_agents.dedupe import dedupe_stats
 
 
-from civic_agents.extract import extract_text_from_bytes, sniff_content_type
-from civic_agents.summarizer import summarize_text
+from civic_agents.extract import extract_text_from_file, extract_pdf_text, sniff_content_type, shutdown_pdf_pool
+from civic_agents.summarizer import summarize_text, stream_summary
+from civic_agents.html_backend import html_to_text
 
 
 PDF_HINT = re.compile(r"\.pdf($|\?)", re.I)
@@ -31,36 +43,27 @@ load_dotenv()
 app = FastAPI()
 
 
-CITY_SOURCES_PATH = pathlib.Path("city_sources.json")
+@app.on_event("startup")
+async def _startup():
+    await http_client.start_client()
+    await start_workers()
+    # background crawl of every city; can also run standalone via `python -m civic_agents.scheduler`
+    if os.getenv("CIVIC_SCHEDULER", "0") == "1":
+        start_scheduler()
 
-def _load_city_sources() -> dict:
-    try:
-        with CITY_SOURCES_PATH.open("r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return {}
-
-def _norm(s: str) -> str:
-    return "".join((s or "").split()).replace(".", "").replace("-", "")
-
-def _seeds_for_user(user: dict) -> list[str]:
-    data = _load_city_sources()  
-
-    city = user.get("city") or ""
-    region = (user.get("region") or "").upper()
-    country = (user.get("country") or "US").upper()
-
-    keys_to_try = [
-        f"{_norm(city)},{region},{country}",
-        f"{_norm(city)},{region},US",
-        f"{_norm(city)},{region}",
-    ]
-    for k in keys_to_try:
-        seeds = data.get(k)
-        if seeds:
-            return seeds
-
-    # fallback to ENV
+@app.on_event("shutdown")
+async def _shutdown():
+    await stop_scheduler()
+    await stop_workers()
+    await http_client.close_client()
+    close_db()
+    shutdown_pdf_pool()
+
+
+def _has_coords(user: dict) -> bool:
+    return user.get("lat") is not None and user.get("lon") is not None
+
+def _env_seeds() -> list[str]:
     raw = os.getenv("CIVIC_SOURCE_URLS", "")
     seeds = []
     for line in raw.splitlines():
@@ -70,43 +73,227 @@ def _seeds_for_user(user: dict) -> list[str]:
                 seeds.append(u)
     return seeds
 
-
-@app.post("/agent/run-for-me")
-async def run_for_me(user_id: str = "demo", limit_per_site: int = 10):
+def _user_targets(user: dict) -> list[tuple[str, list[str]]]:
+    """(city key, seeds) for each jurisdiction the user's runs cover.
+
+    A known city name maps to its registry key ("NYC" and "New York" share one
+    feed). Otherwise the nearest jurisdictions to the user's coordinates are
+    used (e.g. city + county), each run under its own key so its docs and run
+    freshness stay with it.
+    """
+    city, region, country = user.get("city") or "", user.get("region"), user.get("country")
+    key = resolve_city(city, region, country)
+    if key:
+        return [(key, seeds_for_city(city, region, country))]
+    if _has_coords(user):
+        sources = city_sources()
+        near = [k for k, _ in nearest_jurisdictions(user["lat"], user["lon"])]
+        if near:
+            return [(k, list(sources[k])) for k in near]
+    seeds = _env_seeds()
+    return [(city_key(city, region, country), seeds)] if seeds else []
+
+def _city_keys(user: dict) -> list[str]:
+    city, region, country = user.get("city") or "", user.get("region"), user.get("country")
+    return [k for k, _ in _user_targets(user)] or [city_key(city, region, country)]
+
+
+def _user_and_targets(user_id: str) -> tuple[Optional[dict], list[tuple[str, list[str]]], Optional[str]]:
     user = get_user(user_id)
-    if not user or not user.get("city"):
-        return {"error": "Set your location first with POST /me/location"}
+    if not user or not (user.get("city") or _has_coords(user)):
+        return user, [], "Set your location first with POST /me/location"
 
-    seeds = _seeds_for_user(user)
-    if not seeds:
-        return {"error": f"No seeds found for {user.get('city')},{user.get('region')},{user.get('country')}. "
-                         f"Add to city_sources.json or set CIVIC_SOURCE_URLS."}
+    targets = _user_targets(user)
+    if not targets:
+        return user, [], (f"No seeds found for {user.get('city')},{user.get('region')},{user.get('country')}. "
+                          f"Add to city_sources.json, send lat/lon, or set CIVIC_SOURCE_URLS.")
+    set_subscriptions(user_id, [k for k, _ in targets])
+    return user, targets, None
+
+
+def _is_new(r: dict) -> bool:
+    return "error" not in r and r.get("status") not in ("unchanged", "duplicate")
 
-    urls = await discover_sources_from(seeds, limit_per_site=limit_per_site)
-    results = []
-    for u in urls:
-        try:
-            item = await process_link(u, user_id=user_id)   
-            results.append(item)
-        except Exception as e:
-            results.append({"source_url": u, "error": str(e)})
 
+def _run_summary(user: dict, seeds: list[str], results: list[dict]) -> dict:
     return {
         "user": {"city": user.get("city"), "region": user.get("region"), "country": user.get("country")},
         "seeds_used": seeds,
         "discovered": len(results),
-        "ok": sum(1 for r in results if "error" not in r),
+        "ok": sum(1 for r in results if _is_new(r)),
+        "unchanged": sum(1 for r in results if r.get("status") == "unchanged"),
+        "duplicates": sum(1 for r in results if r.get("status") == "duplicate"),
         "errors": [r for r in results if "error" in r][:5],
         "preview": [
             {"title": r.get("title"), "source_url": r.get("source_url")}
-            for r in results if "error" not in r
+            for r in results if _is_new(r)
         ][:8],
     }
 
 
+# a city processed this recently is served from the shared docs instead of re-running
+CITY_FRESH_SECONDS = int(os.getenv("CIVIC_CITY_FRESH_SECONDS", "900"))
+
+
+def _shared_summary(user: dict, run: dict) -> dict:
+    return {
+        **run["summary"],
+        "user": {"city": user.get("city"), "region": user.get("region"), "country": user.get("country")},
+        "shared": True,
+        "last_run_at": run["finished_at"],
+    }
+
+
+def _combined_summary(user: dict, parts: list[tuple[str, dict]]) -> dict:
+    # one response for a run over several jurisdictions; per-city detail under "cities"
+    out = {
+        "user": {"city": user.get("city"), "region": user.get("region"), "country": user.get("country")},
+        "seeds_used": [u for _, p in parts for u in p.get("seeds_used", [])],
+        "cities": [{"city": city, **p} for city, p in parts],
+    }
+    for k in ("discovered", "ok", "unchanged", "duplicates"):
+        out[k] = sum(p.get(k, 0) for _, p in parts)
+    out["errors"] = [e for _, p in parts for e in p.get("errors", [])][:5]
+    out["preview"] = [x for _, p in parts for x in p.get("preview", [])][:8]
+    return out
+
+
+async def _run_city(user_id: str, user: dict, city: str, seeds: list[str],
+                    limit_per_site: int, force: bool) -> dict:
+    run = None if force else await asyncio.to_thread(recent_city_run, city, CITY_FRESH_SECONDS)
+    if run:
+        return _shared_summary(user, run)
+    urls = await discover_sources_from(seeds, limit_per_site=limit_per_site)
+    results = await run_pipeline(urls, user_id=user_id, city=city)
+    summary = _run_summary(user, seeds, results)
+    await asyncio.to_thread(record_city_run, city, seeds, summary)
+    return summary
+
+
+@app.post("/agent/run-for-me")
+async def run_for_me(user_id: str = "demo", limit_per_site: int = 10, force: bool = False):
+    user, targets, error = await asyncio.to_thread(_user_and_targets, user_id)
+    if error:
+        return {"error": error}
+
+    token = metrics.start_run()
+    try:
+        summaries = await asyncio.gather(*(
+            _run_city(user_id, user, city, seeds, limit_per_site, force) for city, seeds in targets
+        ))
+    finally:
+        timings = metrics.finish_run(token)
+
+    if len(targets) == 1:
+        summary = summaries[0]
+        return summary if summary.get("shared") else {**summary, "timings": timings}
+    return {**_combined_summary(user, [(city, s) for (city, _), s in zip(targets, summaries)]), "timings": timings}
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _item_event(index: int, r: dict) -> dict:
+    if "error" in r:
+        return {"index": index, "status": "error", "source_url": r.get("source_url"), "error": r["error"]}
+    if r.get("status") == "unchanged":
+        return {"index": index, "status": "unchanged", "source_url": r.get("source_url")}
+    if r.get("status") == "duplicate":
+        return {"index": index, "status": "duplicate", "source_url": r.get("source_url"),
+                "duplicate_of": r.get("duplicate_of"), "similarity": r.get("similarity")}
+    return {
+        "index": index,
+        "status": "ok",
+        "source_url": r.get("source_url"),
+        "title": r.get("title"),
+        "date": r.get("date"),
+        "highlights": (r.get("highlights") or [])[:3],
+        "why_matters": r.get("why_matters"),
+    }
+
+
+@app.post("/agent/run-for-me/stream")
+async def run_for_me_stream(user_id: str = "demo", limit_per_site: int = 10, force: bool = False):
+    # Same run as /agent/run-for-me, but as Server-Sent Events:
+    # "discovery" -> one "item" per finished link -> "done" with the tally.
+    # With several jurisdictions the events carry a "city" field and item
+    # indexes continue across cities.
+    async def events():
+        user, targets, error = await asyncio.to_thread(_user_and_targets, user_id)
+        if error:
+            yield _sse("error", {"error": error})
+            return
+
+        multi = len(targets) > 1
+        tag = lambda city: {"city": city} if multi else {}
+        parts: list[tuple[str, dict]] = []
+        offset = 0
+        for city, seeds in targets:
+            run = None if force else await asyncio.to_thread(recent_city_run, city, CITY_FRESH_SECONDS)
+            if run:
+                parts.append((city, _shared_summary(user, run)))
+                continue
+
+            yield _sse("discovery", {**tag(city), "status": "started", "seeds": seeds})
+            urls = await discover_sources_from(seeds, limit_per_site=limit_per_site)
+            yield _sse("discovery", {**tag(city), "status": "done", "discovered": len(urls), "urls": urls})
+
+            results: list[dict] = [{} for _ in urls]
+            async for i, r in iter_pipeline(urls, user_id=user_id, city=city):
+                results[i] = r
+                yield _sse("item", {**tag(city), **_item_event(offset + i, r)})
+            offset += len(urls)
+
+            summary = _run_summary(user, seeds, results)
+            await asyncio.to_thread(record_city_run, city, seeds, summary)
+            parts.append((city, summary))
+
+        yield _sse("done", _combined_summary(user, parts) if multi else parts[0][1])
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+
+@app.post("/jobs")
+async def create_run_job(user_id: str = "demo", limit_per_site: int = 10):
+    user, targets, error = await asyncio.to_thread(_user_and_targets, user_id)
+    if error:
+        return {"error": error}
+    jobs = []
+    for city, seeds in targets:  # one job per jurisdiction, each saved under its own city
+        job_id, coalesced = await submit_job(user_id, seeds, limit_per_site=limit_per_site, city=city)
+        jobs.append({"job_id": job_id, "coalesced": coalesced, "status_url": f"/jobs/{job_id}", "city": city})
+    return {**{k: v for k, v in jobs[0].items() if k != "city"}, **({"jobs": jobs} if len(jobs) > 1 else {})}
+
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str, items: bool = True):
+    job = get_job(job_id, with_items=items)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.post("/jobs/{job_id}/cancel")
+async def job_cancel(job_id: str):
+    return {"cancelled": await cancel_job(job_id)}
+
+
+
+@app.get("/search")
+def search(q: str, user_id: Optional[str] = None, city: Optional[str] = None, limit: int = 20):
+    limit = max(1, min(limit, 100))
+    return {"query": q, "items": search_docs(q, user_id=user_id, city=city, limit=limit)}
+
+
 
 class LocationIn(BaseModel):
-    city: str
+    city: str = ""          # may be empty when lat/lon are given
     region: Optional[str] = ""
     country: Optional[str] = "US"
     lat: Optional[float] = None
@@ -126,21 +313,15 @@ app.add_middleware(
 
 
 async def fetch_url_bytes(url: str) -> tuple[bytes, str]:
-    async with httpx.AsyncClient(follow_redirects=True, timeout=25) as client:
-        r = await client.get(url)
-        r.raise_for_status()
-        return r.content, r.headers.get("content-type", "") or ""
+    r = await http_client.get(url)
+    r.raise_for_status()
+    return r.content, r.headers.get("content-type", "") or ""
 
-def extract_text_from_pdf(data: bytes) -> str:
-    with pdfplumber.open(io.BytesIO(data)) as pdf:
-        pages = [p.extract_text() or "" for p in pdf.pages]
-    return "\n\n".join(pages).strip()
+async def extract_text_from_pdf(data: bytes) -> str:
+    return (await extract_pdf_text(data)).strip()
 
 def extract_text_from_html(data: bytes) -> str:
-    soup = BeautifulSoup(data, "html.parser")
-    for t in soup(["script", "style", "noscript"]):
-        t.extract()
-    return " ".join(soup.get_text(" ").split()).strip()
+    return html_to_text(data)
 
 def civicdoc_from_item(item: dict, source_label: Optional[str], user_id: Optional[str]) -> CivicDoc:
     title = item.get("title") or "Civic Update"
@@ -163,6 +344,7 @@ def civicdoc_from_item(item: dict, source_label: Optional[str], user_id: Optiona
         uncertainty=uncertainty,
         fetched_at=datetime.utcnow().isoformat(),
         user_id=user_id,    
+        body=item.get("body") or "",
     )
 
 
@@ -170,6 +352,51 @@ class SummarizeRequest(BaseModel):
     url: Optional[str] = None
     text: Optional[str] = None
     neighborhood: Optional[str] = None
+    user_id: Optional[str] = "demo"
+
+
+async def _summarize_input(req: SummarizeRequest) -> tuple[str, str]:
+    if not (req.url or req.text):
+        raise HTTPException(status_code=400, detail="Provide url or text")
+
+    source_label = None
+    if req.url:
+        data, ctype = await fetch_url_bytes(req.url)
+        if "pdf" in ctype.lower() or PDF_HINT.search(req.url):
+            doc_text = await extract_text_from_pdf(data)
+        else:
+            doc_text = extract_text_from_html(data)
+        source_label = req.url
+    else:
+        doc_text = req.text or ""
+        source_label = "raw_text"
+
+    if not doc_text or len(doc_text.strip()) < 20:
+        raise HTTPException(status_code=422, detail="Not enough text extracted to summarize.")
+    return doc_text, source_label
+
+
+def _summary_stream(text: str, source_url: Optional[str], source_label: Optional[str],
+                    user_id: Optional[str]) -> StreamingResponse:
+    # SSE: "title" and one "highlight" per bullet as the model writes them,
+    # then "item" with the validated summary and "done" once it is saved
+    async def events():
+        try:
+            async for kind, value in stream_summary(text, source_url=source_url):
+                if kind == "item":
+                    yield _sse("item", {k: v for k, v in value.items() if k != "body"})
+                    doc_id = await save_doc_async(civicdoc_from_item(value, source_label, user_id=user_id))
+                    yield _sse("done", {"saved": True, "id": doc_id})
+                else:
+                    yield _sse(kind, {kind: value})
+        except Exception as e:
+            yield _sse("error", {"error": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.post("/summarize")
@@ -190,31 +417,19 @@ async def summarize_json(req: SummarizeRequest):
             }
         }
 
-    if not (req.url or req.text):
-        raise HTTPException(status_code=400, detail="Provide url or text")
-
-    source_label = None
-    if req.url:
-        data, ctype = await fetch_url_bytes(req.url)
-        if "pdf" in ctype.lower() or PDF_HINT.search(req.url):
-            doc_text = extract_text_from_pdf(data)
-        else:
-            doc_text = extract_text_from_html(data)
-        source_label = req.url
-    else:
-        doc_text = req.text or ""
-        source_label = "raw_text"
-
-    if not doc_text or len(doc_text.strip()) < 20:
-        raise HTTPException(status_code=422, detail="Not enough text extracted to summarize.")
-
+    doc_text, source_label = await _summarize_input(req)
     item = await summarize_text(doc_text, source_url=(req.url or None))
 
-    civic_doc = civicdoc_from_item(item, source_label, user_id=user_id)
-    save_doc(civic_doc)
+    civic_doc = civicdoc_from_item(item, source_label, user_id=req.user_id)
+    await save_doc_async(civic_doc)
 
     return {"saved": True, "item": item}
 
+@app.post("/summarize/stream")
+async def summarize_json_stream(req: SummarizeRequest):
+    doc_text, source_label = await _summarize_input(req)
+    return _summary_stream(doc_text, req.url or None, source_label, req.user_id)
+
 @app.post("/summarize/upload")
 async def summarize_upload(
     file: UploadFile = File(...),
@@ -222,48 +437,71 @@ async def summarize_upload(
     user_id: Optional[str] = Form("demo"),
 ):
 
-    raw = await file.read()
     ctype = sniff_content_type(file.filename, file.content_type)
-    text = await extract_text_from_bytes(raw, ctype)
+    text = await extract_text_from_file(file.file, ctype)
 
     if not text or len(text.strip()) < 20:
         raise HTTPException(status_code=422, detail="Not enough text extracted to summarize.")
 
     item = await summarize_text(text, source_url=None)
 
-    civic_doc = civicdoc_from_item(item, file.filename or "uploaded.pdf")
-    save_doc(civic_doc)
+    civic_doc = civicdoc_from_item(item, file.filename or "uploaded.pdf", user_id=user_id)
+    await save_doc_async(civic_doc)
 
     return {"saved": True, "item": item}
 
-@app.get("/feed")
-def feed():
-    return {"items": get_feed()}
+@app.post("/summarize/upload/stream")
+async def summarize_upload_stream(
+    file: UploadFile = File(...),
+    neighborhood: Optional[str] = Form(None),
+    user_id: Optional[str] = Form("demo"),
+):
+    # the upload is extracted before streaming starts; the file is closed once we return
+    ctype = sniff_content_type(file.filename, file.content_type)
+    text = await extract_text_from_file(file.file, ctype)
 
+    if not text or len(text.strip()) < 20:
+        raise HTTPException(status_code=422, detail="Not enough text extracted to summarize.")
+
+    return _summary_stream(text, None, file.filename or "uploaded.pdf", user_id)
+
+@app.get("/feed")
+def feed(
+    user_id: Optional[str] = None,
+    city: Optional[str] = None,
+    tag: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    cursor: Optional[int] = None,
+    limit: int = 20,
+    fields: Optional[str] = None,
+):
+    limit = max(1, min(limit, 100))
+    items = get_feed(
+        user_id=user_id, limit=limit, city=city, tag=tag, since=since, until=until,
+        before_id=cursor, fields=[f.strip() for f in fields.split(",")] if fields else None,
+    )
+    next_cursor = items[-1]["id"] if len(items) == limit else None
+    return {"items": items, "next_cursor": next_cursor}
 
-from civic_agents.coordinator import run_once as agent_run_once
 
 @app.post("/agent/run-once")
-async def run_once_endpoint(user_id: str = "demo"):
-    items = await agent_run_once(user_id=user_id)   
-    return {
-        "discovered": len(items),
-        "ok": sum(1 for x in items if "error" not in x),
-        "errors": [x for x in items if "error" in x][:3],
-        "preview": [ {"title": x.get("title"), "source_url": x.get("source_url")} for x in items if "error" not in x ][:5]
-    }
+async def run_once_endpoint(user_id: str = "demo", limit_per_site: int = 10):
+    # the user's sources, discovered and processed now even if their city ran recently
+    return await run_for_me(user_id=user_id, limit_per_site=limit_per_site, force=True)
 
 
 @app.get("/me")
 async def get_me(user_id: str = "demo"):
-    user = get_user(user_id)
+    user = await asyncio.to_thread(get_user, user_id)
     if not user:
         return {"ok": False, "error": "User not found"}
     return {"ok": True, **user}
 
 @app.post("/me/location")
 async def set_location(loc: LocationIn, request: Request, user_id: str = "demo"):
-    upsert_user(
+    await asyncio.to_thread(
+        upsert_user,
         user_id,
         city=loc.city,
         region=loc.region,
@@ -271,10 +509,32 @@ async def set_location(loc: LocationIn, request: Request, user_id: str = "demo")
         lat=loc.lat,
         lon=loc.lon,
     )
+    keys = await asyncio.to_thread(_city_keys, loc.__dict__)  # registry + geo grid may re-read files
+    await asyncio.to_thread(set_subscriptions, user_id, keys)
     return {"ok": True, "user_id": user_id, "city": loc.city, "region": loc.region, "country": loc.country}
 
 
 @app.get("/debug/city-sources-keys")
 def debug_city_keys():
-    return {"keys": list(_load_city_sources().keys())[:200]}
+    return {"keys": list(city_sources().keys())[:200]}
+
+
+@app.get("/debug/nearest")
+def debug_nearest(lat: float, lon: float, k: int = 3):
+    return {"items": [{"key": key, "km": km} for key, km in nearest_jurisdictions(lat, lon, k=k)]}
+
+
+@app.get("/debug/city-sources-report")
+def debug_city_sources_report():
+    return city_registry().report()
+
+
+@app.get("/debug/cache-stats")
+def debug_cache_stats():
+    return {"summary_cache": cache_stats(), "dedupe": dedupe_stats(), "artifacts": artifact_stats()}
+
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -1,6 +1,6 @@
 from typing import List, Optional, Dict
 from .db import conn
-from .feed import save_doc, get_feed
+from .feed import save_doc, save_docs, save_doc_async, get_feed
 from .users import upsert_user, get_user
 
 class CivicDoc:
@@ -0,0 +1,212 @@
+# storage/artifacts.py
+import os
+import time
+import zlib
+import hashlib
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Iterator
+from .db import conn, ensure_schema, APP_DIR
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Content-addressed store for downloaded bodies and their extracted text, so
+# the corpus can be re-summarized (new prompt or model) without fetching or
+# parsing anything again. Blobs live on disk under their sha256, compressed
+# with zstd when the package is installed and zlib otherwise; the index and
+# each URL's latest raw/text digests are in SQLite. Identical content is
+# stored once. When the store grows past ARTIFACT_MAX_BYTES (compressed),
+# the least recently used blobs are deleted.
+ARTIFACTS = os.getenv("CIVIC_ARTIFACTS", "1") == "1"
+ARTIFACT_DIR = Path(os.getenv("CIVIC_ARTIFACT_DIR", str(APP_DIR / "artifacts")))
+ARTIFACT_MAX_BYTES = int(os.getenv("CIVIC_ARTIFACT_MAX_BYTES", str(1024 * 1024 * 1024)))
+ARTIFACT_ZSTD_LEVEL = int(os.getenv("CIVIC_ARTIFACT_ZSTD_LEVEL", "10"))
+ARTIFACT_ZLIB_LEVEL = int(os.getenv("CIVIC_ARTIFACT_ZLIB_LEVEL", "6"))
+
+
+ensure_schema()
+
+
+with conn() as c:
+    c.executescript("""
+    CREATE TABLE IF NOT EXISTS artifacts (
+      digest TEXT PRIMARY KEY,           -- sha256 of the uncompressed content
+      codec TEXT,                        -- zstd | zlib
+      size INTEGER,                      -- uncompressed bytes
+      stored INTEGER,                    -- bytes on disk
+      created_at REAL,
+      last_used_at REAL
+    );
+    CREATE INDEX IF NOT EXISTS idx_artifacts_last_used ON artifacts(last_used_at);
+    CREATE TABLE IF NOT EXISTS artifact_refs (
+      url TEXT PRIMARY KEY,
+      content_type TEXT,
+      raw_digest TEXT,
+      text_digest TEXT,
+      updated_at TEXT
+    );
+    """)
+    c.commit()
+
+_STATS: Dict[str, int] = {"writes": 0, "dedupe_hits": 0, "evictions": 0, "bytes_in": 0, "bytes_stored": 0}
+
+
+def _codec() -> str:
+    return "zstd" if zstandard is not None else "zlib"
+
+
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=ARTIFACT_ZSTD_LEVEL).compress(data)
+    return zlib.compress(data, ARTIFACT_ZLIB_LEVEL)
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("artifact was stored with zstd; install the zstandard package to read it")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def _path(digest: str, codec: str) -> Path:
+    return ARTIFACT_DIR / digest[:2] / f"{digest}.{'zst' if codec == 'zstd' else 'zz'}"
+
+
+def put_artifact(data: bytes) -> str:
+    """Store data (once per distinct content) and return its sha256 digest."""
+    digest = hashlib.sha256(data).hexdigest()
+    now = time.time()
+    with conn() as c:
+        row = c.execute("SELECT codec FROM artifacts WHERE digest = ?", (digest,)).fetchone()
+        if row and _path(digest, row[0]).exists():
+            c.execute("UPDATE artifacts SET last_used_at = ? WHERE digest = ?", (now, digest))
+            _STATS["dedupe_hits"] += 1
+            return digest
+
+    codec = _codec()
+    blob = _compress(data, codec)
+    path = _path(digest, codec)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # unique temp name per writer (threads share a pid); readers never see a partial blob
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f"{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(blob)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+
+    with conn() as c:
+        c.execute("""
+            INSERT INTO artifacts (digest, codec, size, stored, created_at, last_used_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(digest) DO UPDATE SET
+              codec=excluded.codec, stored=excluded.stored, last_used_at=excluded.last_used_at
+        """, (digest, codec, len(data), len(blob), now, now))
+    _STATS["writes"] += 1
+    _STATS["bytes_in"] += len(data)
+    _STATS["bytes_stored"] += len(blob)
+    evict_artifacts()
+    return digest
+
+
+def get_artifact(digest: Optional[str]) -> Optional[bytes]:
+    if not digest:
+        return None
+    with conn() as c:
+        row = c.execute("SELECT codec FROM artifacts WHERE digest = ?", (digest,)).fetchone()
+        if not row:
+            return None
+        try:
+            blob = _path(digest, row[0]).read_bytes()
+        except FileNotFoundError:
+            c.execute("DELETE FROM artifacts WHERE digest = ?", (digest,))
+            return None
+        c.execute("UPDATE artifacts SET last_used_at = ? WHERE digest = ?", (time.time(), digest))
+    return _decompress(blob, row[0])
+
+
+def evict_artifacts(max_bytes: int = ARTIFACT_MAX_BYTES) -> int:
+    """Delete least recently used blobs until the store is under max_bytes.
+
+    Eviction goes down to 90% of the cap so a busy crawl doesn't evict on
+    every write. Returns the number of blobs removed.
+    """
+    with conn() as c:
+        total = c.execute("SELECT COALESCE(SUM(stored), 0) FROM artifacts").fetchone()[0]
+        if total <= max_bytes:
+            return 0
+        target = int(max_bytes * 0.9)
+        victims = []
+        for digest, codec, stored in c.execute(
+            "SELECT digest, codec, stored FROM artifacts ORDER BY last_used_at"
+        ):
+            if total <= target:
+                break
+            victims.append((digest, codec))
+            total -= stored or 0
+        c.executemany("DELETE FROM artifacts WHERE digest = ?", [(d,) for d, _ in victims])
+    for digest, codec in victims:
+        try:
+            _path(digest, codec).unlink()
+        except FileNotFoundError:
+            pass
+    _STATS["evictions"] += len(victims)
+    return len(victims)
+
+
+def save_link_artifacts(url: str, raw: bytes, content_type: str, text: str) -> None:
+    """Keep the body fetched from url and the text extracted from it."""
+    if not ARTIFACTS:
+        return
+    raw_digest = put_artifact(raw)
+    text_digest = put_artifact(text.encode("utf-8", errors="ignore"))
+    with conn() as c:
+        c.execute("""
+            INSERT INTO artifact_refs (url, content_type, raw_digest, text_digest, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(url) DO UPDATE SET
+              content_type=excluded.content_type,
+              raw_digest=excluded.raw_digest,
+              text_digest=excluded.text_digest,
+              updated_at=excluded.updated_at
+        """, (url, content_type, raw_digest, text_digest, datetime.utcnow().isoformat()))
+
+
+def link_artifacts(urls: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+    q = "SELECT url, content_type, raw_digest, text_digest, updated_at FROM artifact_refs"
+    args: List[Any] = []
+    if urls:
+        q += f" WHERE url IN ({','.join('?' * len(urls))})"
+        args = list(urls)
+    with conn() as c:
+        rows = c.execute(q + " ORDER BY url", args).fetchall()
+    for url, ctype, raw_digest, text_digest, updated_at in rows:
+        yield {"url": url, "content_type": ctype, "raw_digest": raw_digest,
+               "text_digest": text_digest, "updated_at": updated_at}
+
+
+def load_text(text_digest: Optional[str]) -> Optional[str]:
+    data = get_artifact(text_digest)
+    return data.decode("utf-8", errors="ignore") if data is not None else None
+
+
+def artifact_stats() -> Dict[str, Any]:
+    with conn() as c:
+        n, size, stored = c.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored), 0) FROM artifacts"
+        ).fetchone()
+        refs = c.execute("SELECT COUNT(*) FROM artifact_refs").fetchone()[0]
+    return {
+        "codec": _codec(), "blobs": n, "urls": refs, "bytes": size, "stored_bytes": stored,
+        "ratio": round(size / stored, 2) if stored else None, "max_bytes": ARTIFACT_MAX_BYTES, **_STATS,
+    }
@@ -0,0 +1,95 @@
+# storage/cache.py
+import os, json, time
+from typing import Optional, Dict, Any
+from .db import conn, ensure_schema
+
+
+ensure_schema()
+
+
+with conn() as c:
+    c.executescript("""
+    CREATE TABLE IF NOT EXISTS summary_cache (
+      key TEXT PRIMARY KEY,              -- sha256(model, prompt version, normalized text)
+      model TEXT,
+      prompt_version TEXT,
+      payload TEXT,                      -- JSON string
+      text_bytes INTEGER,                -- size of the text the model would have read
+      size INTEGER,                      -- size of payload
+      created_at REAL,
+      last_hit_at REAL,
+      hits INTEGER DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS idx_summary_cache_last_hit ON summary_cache(last_hit_at);
+    """)
+    c.commit()
+
+SUMMARY_CACHE_TTL = int(os.getenv("CIVIC_SUMMARY_CACHE_TTL", str(7 * 24 * 3600)))
+SUMMARY_CACHE_MAX_BYTES = int(os.getenv("CIVIC_SUMMARY_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+_STATS: Dict[str, int] = {"hits": 0, "misses": 0, "bytes_saved": 0, "evictions": 0}
+
+
+def cache_get(key: str) -> Optional[Dict[str, Any]]:
+    now = time.time()
+    with conn() as c:
+        row = c.execute(
+            "SELECT payload, text_bytes, created_at FROM summary_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row and SUMMARY_CACHE_TTL > 0 and now - row[2] > SUMMARY_CACHE_TTL:
+            c.execute("DELETE FROM summary_cache WHERE key = ?", (key,))
+            c.commit()
+            _STATS["evictions"] += 1
+            row = None
+        if not row:
+            _STATS["misses"] += 1
+            return None
+        c.execute(
+            "UPDATE summary_cache SET last_hit_at = ?, hits = hits + 1 WHERE key = ?", (now, key)
+        )
+        c.commit()
+    _STATS["hits"] += 1
+    _STATS["bytes_saved"] += int(row[1] or 0)
+    return json.loads(row[0])
+
+
+def cache_put(key: str, model: str, prompt_version: str, payload: Dict[str, Any], text_bytes: int) -> None:
+    now = time.time()
+    blob = json.dumps(payload, ensure_ascii=False)
+    with conn() as c:
+        c.execute("""
+            INSERT OR REPLACE INTO summary_cache
+            (key, model, prompt_version, payload, text_bytes, size, created_at, last_hit_at, hits)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0)
+        """, (key, model, prompt_version, blob, text_bytes, len(blob), now, now))
+        c.commit()
+    _evict()
+
+
+def _evict() -> None:
+    with conn() as c:
+        if SUMMARY_CACHE_TTL > 0:
+            cur = c.execute(
+                "DELETE FROM summary_cache WHERE created_at < ?", (time.time() - SUMMARY_CACHE_TTL,)
+            )
+            _STATS["evictions"] += cur.rowcount
+        total = c.execute("SELECT COALESCE(SUM(size), 0) FROM summary_cache").fetchone()[0]
+        if total > SUMMARY_CACHE_MAX_BYTES:
+            # least recently used first
+            victims = []
+            for key, size in c.execute("SELECT key, size FROM summary_cache ORDER BY last_hit_at ASC"):
+                if total <= SUMMARY_CACHE_MAX_BYTES:
+                    break
+                victims.append((key,))
+                total -= size or 0
+            c.executemany("DELETE FROM summary_cache WHERE key = ?", victims)
+            _STATS["evictions"] += len(victims)
+        c.commit()
+
+
+def cache_stats() -> Dict[str, Any]:
+    with conn() as c:
+        entries, size = c.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM summary_cache"
+        ).fetchone()
+    return {**_STATS, "entries": entries, "size_bytes": size}
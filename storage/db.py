@@ -1,9 +1,18 @@
-import os, sqlite3
+import os, sqlite3, threading
 from pathlib import Path
+from typing import List
 
 
-APP_DIR = Path(__file__).resolve().parents[1]  
-DB_PATH = APP_DIR / "civic.db"
+APP_DIR = Path(__file__).resolve().parents[1]
+DB_PATH = Path(os.getenv("CIVIC_DB_PATH", str(APP_DIR / "civic.db")))
+
+# One long-lived connection per thread (event loop thread + to_thread workers)
+# instead of a fresh connect() per call. sqlite3 keeps a prepared-statement
+# cache per connection, so reuse also saves re-parsing the same SQL.
+SQLITE_SYNCHRONOUS = os.getenv("CIVIC_SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_CACHE_KB = int(os.getenv("CIVIC_SQLITE_CACHE_KB", "20000"))
+SQLITE_BUSY_TIMEOUT = float(os.getenv("CIVIC_SQLITE_BUSY_TIMEOUT", "10"))
+SQLITE_STATEMENT_CACHE = int(os.getenv("CIVIC_SQLITE_STATEMENT_CACHE", "256"))
 
 SCHEMA = """
 CREATE TABLE IF NOT EXISTS users (
@@ -19,12 +28,57 @@ CREATE TABLE IF NOT EXISTS users (
 );
 """
 
+_local = threading.local()
+_all_conns: List[sqlite3.Connection] = []
+_all_lock = threading.Lock()
+_generation = 0
+
 def get_db_path() -> str:
     return str(DB_PATH)
 
-def conn():
+def _connect() -> sqlite3.Connection:
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    return sqlite3.connect(get_db_path())
+    c = sqlite3.connect(
+        get_db_path(),
+        timeout=SQLITE_BUSY_TIMEOUT,
+        cached_statements=SQLITE_STATEMENT_CACHE,
+        check_same_thread=False,
+    )
+    c.execute("PRAGMA journal_mode=WAL")
+    c.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    c.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_KB}")
+    c.execute("PRAGMA temp_store=MEMORY")
+    c.execute("PRAGMA foreign_keys=ON")
+    with _all_lock:
+        _all_conns.append(c)
+    return c
+
+def conn() -> sqlite3.Connection:
+    # `with conn() as c:` commits/rolls back but leaves the connection open
+    c = getattr(_local, "conn", None)
+    if c is None or getattr(_local, "generation", None) != _generation:
+        c = _local.conn = _connect()
+        _local.generation = _generation
+    return c
+
+def close_all() -> None:
+    # other threads notice the bumped generation and reconnect on next use
+    global _generation
+    with _all_lock:
+        conns = list(_all_conns)
+        _all_conns.clear()
+        _generation += 1
+    for c in conns:
+        try:
+            c.close()
+        except Exception:
+            pass
+
+def add_column(c: sqlite3.Connection, table: str, column: str, decl: str) -> None:
+    # CREATE TABLE IF NOT EXISTS won't touch an existing civic.db; add new columns in place
+    cols = {r[1] for r in c.execute(f"PRAGMA table_info({table})")}
+    if column not in cols:
+        c.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
 
 def ensure_schema():
     with conn() as c:
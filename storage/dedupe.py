@@ -0,0 +1,82 @@
+# storage/dedupe.py
+import json
+from datetime import datetime
+from typing import List, Dict, Any, Tuple, Optional
+from .db import conn, ensure_schema
+
+
+ensure_schema()
+
+
+with conn() as c:
+    c.executescript("""
+    CREATE TABLE IF NOT EXISTS doc_signatures (
+      doc_id INTEGER PRIMARY KEY,        -- civic_docs.id
+      signature TEXT,                    -- JSON list of MinHash values
+      created_at TEXT
+    );
+    CREATE TABLE IF NOT EXISTS doc_lsh (
+      band INTEGER,
+      bucket TEXT,
+      doc_id INTEGER
+    );
+    CREATE INDEX IF NOT EXISTS idx_doc_lsh_bucket ON doc_lsh(band, bucket);
+    CREATE INDEX IF NOT EXISTS idx_doc_lsh_doc ON doc_lsh(doc_id);
+
+    -- sources that were not summarized because they matched an existing doc
+    CREATE TABLE IF NOT EXISTS doc_duplicates (
+      url TEXT PRIMARY KEY,
+      doc_id INTEGER,
+      similarity REAL,
+      seen_at TEXT
+    );
+    """)
+    c.commit()
+
+
+def save_signature(doc_id: int, sig: List[int], bands: List[str]) -> None:
+    with conn() as c:
+        c.execute("INSERT OR REPLACE INTO doc_signatures (doc_id, signature, created_at) VALUES (?, ?, ?)",
+                  (doc_id, json.dumps(sig), datetime.utcnow().isoformat()))
+        # a doc re-summarized under the same id replaces its old buckets
+        c.execute("DELETE FROM doc_lsh WHERE doc_id = ?", (doc_id,))
+        c.executemany("INSERT INTO doc_lsh (band, bucket, doc_id) VALUES (?, ?, ?)",
+                      [(i, b, doc_id) for i, b in enumerate(bands)])
+        c.commit()
+
+
+def candidates(bands: List[str]) -> List[Tuple[int, List[int]]]:
+    if not bands:
+        return []
+    clause = " OR ".join("(band = ? AND bucket = ?)" for _ in bands)
+    args: List[Any] = []
+    for i, b in enumerate(bands):
+        args += [i, b]
+    with conn() as c:
+        rows = c.execute(f"""
+            SELECT s.doc_id, s.signature FROM doc_signatures s
+            WHERE s.doc_id IN (SELECT DISTINCT doc_id FROM doc_lsh WHERE {clause})
+        """, tuple(args)).fetchall()
+    return [(doc_id, json.loads(sig)) for doc_id, sig in rows]
+
+
+def record_duplicate(url: str, doc_id: int, similarity: float) -> None:
+    with conn() as c:
+        c.execute("""
+            INSERT OR REPLACE INTO doc_duplicates (url, doc_id, similarity, seen_at)
+            VALUES (?, ?, ?, ?)
+        """, (url, doc_id, similarity, datetime.utcnow().isoformat()))
+        c.commit()
+
+
+def duplicate_of(url: str) -> Optional[int]:
+    with conn() as c:
+        row = c.execute("SELECT doc_id FROM doc_duplicates WHERE url = ?", (url,)).fetchone()
+    return row[0] if row else None
+
+
+def dedupe_counts() -> Dict[str, int]:
+    with conn() as c:
+        indexed = c.execute("SELECT COUNT(*) FROM doc_signatures").fetchone()[0]
+        linked = c.execute("SELECT COUNT(*) FROM doc_duplicates").fetchone()[0]
+    return {"indexed_docs": indexed, "linked_sources": linked}
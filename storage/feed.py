@@ -1,9 +1,14 @@
 # storage/feed.py
 # storage/feed.py
+import os
+import asyncio
 from dataclasses import dataclass
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
-from .db import conn, ensure_schema
+from .db import conn, ensure_schema, add_column
+from .search import index_doc
+from civic_agents.metrics import span, inc
+from . import subscriptions  # noqa: F401  (creates the table get_feed joins)
 
 
 ensure_schema()
@@ -25,6 +30,21 @@ with conn() as c:
       fetched_at TEXT
     );
     """)
+    add_column(c, "civic_docs", "city", "TEXT")
+    c.executescript("""
+    CREATE INDEX IF NOT EXISTS idx_civic_docs_user_id ON civic_docs(user_id, id);
+    CREATE INDEX IF NOT EXISTS idx_civic_docs_city_id ON civic_docs(city, id);
+    CREATE INDEX IF NOT EXISTS idx_civic_docs_fetched_at ON civic_docs(fetched_at);
+    """)
+    # docs with a city are shared: one row per (city, url), users reach them
+    # through subscriptions. Older per-user copies are collapsed to the newest.
+    if not c.execute("SELECT 1 FROM sqlite_master WHERE name = 'idx_civic_docs_city_url'").fetchone():
+        c.execute("""
+            DELETE FROM civic_docs WHERE city IS NOT NULL AND id NOT IN (
+              SELECT MAX(id) FROM civic_docs WHERE city IS NOT NULL GROUP BY city, url
+            )
+        """)
+        c.execute("CREATE UNIQUE INDEX idx_civic_docs_city_url ON civic_docs(city, url) WHERE city IS NOT NULL")
     c.commit()
 
 @dataclass
@@ -39,9 +59,11 @@ class CivicDoc:
     uncertainty: float
     fetched_at: str
     user_id: Optional[str] = None
+    city: Optional[str] = None
+    body: str = ""                       # extracted text; indexed for search, not stored in civic_docs
 
     @staticmethod
-    def from_item(item: Dict[str, Any], user_id: Optional[str] = None) -> "CivicDoc":
+    def from_item(item: Dict[str, Any], user_id: Optional[str] = None, city: Optional[str] = None) -> "CivicDoc":
         return CivicDoc(
             url=item.get("source_url") or item.get("url") or "",
             title=item.get("title") or "Civic Update",
@@ -53,6 +75,8 @@ class CivicDoc:
             uncertainty=float(item.get("uncertainty", 0.3)),
             fetched_at=item.get("fetched_at") or datetime.utcnow().isoformat(),
             user_id=user_id,
+            city=city,
+            body=item.get("body") or "",
         )
 
 def _dump_json(x: Any) -> str:
@@ -63,30 +87,194 @@ def _load_json(s: Optional[str]) -> Any:
     import json
     return json.loads(s or "[]")
 
+_INSERT_DOC = """
+INSERT INTO civic_docs
+(user_id, url, title, tl_dr, what_changes, what_residents_should_know,
+ actions_for_residents, tags, uncertainty, fetched_at, city)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(city, url) WHERE city IS NOT NULL DO UPDATE SET
+  title=excluded.title,
+  tl_dr=excluded.tl_dr,
+  what_changes=excluded.what_changes,
+  what_residents_should_know=excluded.what_residents_should_know,
+  actions_for_residents=excluded.actions_for_residents,
+  tags=excluded.tags,
+  uncertainty=excluded.uncertainty,
+  fetched_at=excluded.fetched_at
+RETURNING id
+"""
+
+def _doc_row(doc: CivicDoc) -> tuple:
+    return (
+        doc.user_id, doc.url, doc.title, doc.tl_dr,
+        _dump_json(doc.what_changes),
+        _dump_json(doc.what_residents_should_know),
+        _dump_json(doc.actions_for_residents),
+        _dump_json(doc.tags),
+        doc.uncertainty, doc.fetched_at, doc.city
+    )
+
 def save_doc(doc: CivicDoc) -> int:
+    return save_docs([doc])[0]
+
+def save_docs(docs: List[CivicDoc]) -> List[int]:
+    # one transaction (one fsync) for the whole batch
+    ids: List[int] = []
+    with span("save_doc"), conn() as c:
+        for doc in docs:
+            doc_id = int(c.execute(_INSERT_DOC, _doc_row(doc)).fetchone()[0])
+            index_doc(c, doc_id, doc.title, doc.tl_dr, doc.what_residents_should_know, doc.body)
+            ids.append(doc_id)
+    inc("civic_docs_saved_total", len(ids))
+    return ids
+
+
+# Pipeline workers save through a small write-behind batcher: docs that
+# finish close together share one commit, and the sqlite work runs off the
+# event loop.
+SAVE_BATCH_SIZE = int(os.getenv("CIVIC_SAVE_BATCH_SIZE", "32"))
+SAVE_BATCH_DELAY = float(os.getenv("CIVIC_SAVE_BATCH_DELAY", "0.05"))
+
+# pending saves per event loop: {"loop", "docs": [(doc, future)], "handle"};
+# a timer or future from one loop must never be used from another
+_pending: Dict[int, Dict[str, Any]] = {}
+_flush_tasks: set = set()
+
+def _loop_pending() -> Dict[str, Any]:
+    loop = asyncio.get_running_loop()
+    p = _pending.get(id(loop))
+    if p is None or p["loop"] is not loop:
+        for k, old in list(_pending.items()):
+            if old["loop"].is_closed():
+                del _pending[k]
+        p = _pending[id(loop)] = {"loop": loop, "docs": [], "handle": None}
+    return p
+
+def _schedule_flush(p: Dict[str, Any]) -> None:
+    t = asyncio.create_task(_flush(p))
+    _flush_tasks.add(t)
+    t.add_done_callback(_flush_tasks.discard)
+
+async def _flush(p: Dict[str, Any]) -> None:
+    if p["handle"] is not None:
+        p["handle"].cancel()
+        p["handle"] = None
+    batch, p["docs"] = p["docs"], []
+    if not batch:
+        return
+    try:
+        ids = await asyncio.to_thread(save_docs, [d for d, _ in batch])
+    except Exception as e:
+        for _, fut in batch:
+            if not fut.done():
+                fut.set_exception(e)
+        return
+    for (_, fut), doc_id in zip(batch, ids):
+        if not fut.done():
+            fut.set_result(doc_id)
+
+async def save_doc_async(doc: CivicDoc) -> int:
+    p = _loop_pending()
+    fut = p["loop"].create_future()
+    p["docs"].append((doc, fut))
+    if len(p["docs"]) >= SAVE_BATCH_SIZE:
+        _schedule_flush(p)
+    elif p["handle"] is None:
+        p["handle"] = p["loop"].call_later(SAVE_BATCH_DELAY, _schedule_flush, p)
+    return await fut
+
+def latest_doc_for_url(url: str, other_than_city: Optional[str] = None) -> Optional[int]:
+    # most recently summarized doc for url, skipping the asking city's own copy
     with conn() as c:
-        cur = c.execute("""
-        INSERT INTO civic_docs
-        (user_id, url, title, tl_dr, what_changes, what_residents_should_know,
-         actions_for_residents, tags, uncertainty, fetched_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            doc.user_id, doc.url, doc.title, doc.tl_dr,
-            _dump_json(doc.what_changes),
-            _dump_json(doc.what_residents_should_know),
-            _dump_json(doc.actions_for_residents),
-            _dump_json(doc.tags),
-            doc.uncertainty, doc.fetched_at
-        ))
-        c.commit()
-        return int(cur.lastrowid)
-
-def get_feed(user_id: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
-    q = "SELECT user_id, url, title, tl_dr, what_changes, what_residents_should_know, actions_for_residents, tags, uncertainty, fetched_at FROM civic_docs"
+        row = c.execute("""
+            SELECT id FROM civic_docs WHERE url = ? AND city IS NOT ?
+            ORDER BY fetched_at DESC, id DESC LIMIT 1
+        """, (url, other_than_city)).fetchone()
+    return row[0] if row else None
+
+def share_doc(doc_id: int, city: str, user_id: Optional[str] = None) -> Optional[int]:
+    # A source reached from several cities is summarized once; the other
+    # cities get a copy of the row (and its search entry), refreshed when the
+    # source doc is newer than the copy. Returns the copy's id, or None if the
+    # city already has this version.
+    with span("save_doc"), conn() as c:
+        row = c.execute("""
+            INSERT INTO civic_docs
+            (user_id, url, title, tl_dr, what_changes, what_residents_should_know,
+             actions_for_residents, tags, uncertainty, fetched_at, city)
+            SELECT COALESCE(?, user_id), url, title, tl_dr, what_changes, what_residents_should_know,
+                   actions_for_residents, tags, uncertainty, fetched_at, ?
+            FROM civic_docs WHERE id = ?
+            ON CONFLICT(city, url) WHERE city IS NOT NULL DO UPDATE SET
+              title=excluded.title,
+              tl_dr=excluded.tl_dr,
+              what_changes=excluded.what_changes,
+              what_residents_should_know=excluded.what_residents_should_know,
+              actions_for_residents=excluded.actions_for_residents,
+              tags=excluded.tags,
+              uncertainty=excluded.uncertainty,
+              fetched_at=excluded.fetched_at
+            WHERE excluded.fetched_at > civic_docs.fetched_at
+            RETURNING id
+        """, (user_id, city, doc_id)).fetchone()
+        if not row:
+            return None
+        c.execute("""
+            INSERT OR REPLACE INTO civic_docs_fts (rowid, title, tl_dr, highlights, body)
+            SELECT ?, title, tl_dr, highlights, body FROM civic_docs_fts WHERE rowid = ?
+        """, (row[0], doc_id))
+    inc("civic_docs_saved_total")
+    return int(row[0])
+
+def shared_doc_cities(url: str) -> List[Tuple[Optional[str], str]]:
+    # (user_id, city) of the shared docs built from url
+    with conn() as c:
+        return c.execute(
+            "SELECT user_id, city FROM civic_docs WHERE url = ? AND city IS NOT NULL", (url,)
+        ).fetchall()
+
+FEED_COLUMNS = [
+    "id", "user_id", "city", "url", "title", "tl_dr", "what_changes",
+    "what_residents_should_know", "actions_for_residents", "tags",
+    "uncertainty", "fetched_at",
+]
+JSON_COLUMNS = {"what_changes", "what_residents_should_know", "actions_for_residents", "tags"}
+
+def get_feed(user_id: Optional[str] = None, limit: int = 20, *,
+             city: Optional[str] = None, tag: Optional[str] = None,
+             since: Optional[str] = None, until: Optional[str] = None,
+             before_id: Optional[int] = None,
+             fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    # Keyset pagination: pass the last item's id as before_id for the next page.
+    # Only the requested fields are selected, so JSON columns a caller doesn't
+    # need are never decoded.
+    cols = [f for f in (fields or FEED_COLUMNS) if f in FEED_COLUMNS]
+    if "id" not in cols:
+        cols.insert(0, "id")
+    q = f"SELECT {', '.join(cols)} FROM civic_docs"
+    where: List[str] = []
     args: List[Any] = []
     if user_id:
-        q += " WHERE user_id = ?"
-        args.append(user_id)
+        # a user's feed is their own uploads plus every doc of the cities they follow
+        where.append("(user_id = ? OR city IN (SELECT city FROM subscriptions WHERE user_id = ?))")
+        args += [user_id, user_id]
+    if city:
+        where.append("city = ?")
+        args.append(city)
+    if tag:
+        where.append("EXISTS (SELECT 1 FROM json_each(civic_docs.tags) WHERE value = ?)")
+        args.append(tag)
+    if since:
+        where.append("fetched_at >= ?")
+        args.append(since)
+    if until:
+        where.append("fetched_at < ?")
+        args.append(until)
+    if before_id is not None:
+        where.append("id < ?")
+        args.append(before_id)
+    if where:
+        q += " WHERE " + " AND ".join(where)
     q += " ORDER BY id DESC LIMIT ?"
     args.append(limit)
 
@@ -95,17 +283,8 @@ def get_feed(user_id: Optional[str] = None, limit: int = 20) -> List[Dict[str, A
 
     out = []
     for r in rows:
-        (uid, url, title, tl_dr, wc, wrsk, act, tags, un, ts) = r
         out.append({
-            "user_id": uid,
-            "url": url,
-            "title": title,
-            "tl_dr": tl_dr,
-            "what_changes": _load_json(wc),
-            "what_residents_should_know": _load_json(wrsk),
-            "actions_for_residents": _load_json(act),
-            "tags": _load_json(tags),
-            "uncertainty": un,
-            "fetched_at": ts,
+            col: (_load_json(val) if col in JSON_COLUMNS else val)
+            for col, val in zip(cols, r)
         })
     return out
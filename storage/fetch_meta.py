@@ -0,0 +1,87 @@
+# storage/fetch_meta.py
+import json
+from datetime import datetime
+from typing import Optional, Dict, Any, List
+from .db import conn, ensure_schema, add_column
+
+
+ensure_schema()
+
+
+with conn() as c:
+    c.executescript("""
+    CREATE TABLE IF NOT EXISTS fetch_meta (
+      url TEXT PRIMARY KEY,
+      etag TEXT,
+      last_modified TEXT,
+      digest TEXT,                       -- sha256 of the response body
+      links TEXT,                        -- JSON string, discovery pages only
+      checked_at TEXT,
+      changed_at TEXT
+    );
+    """)
+    add_column(c, "fetch_meta", "checks", "INTEGER DEFAULT 0")
+    add_column(c, "fetch_meta", "changes", "INTEGER DEFAULT 0")
+    c.commit()
+
+
+def get_fetch_meta(url: str) -> Optional[Dict[str, Any]]:
+    with conn() as c:
+        row = c.execute(
+            "SELECT etag, last_modified, digest, links, checked_at, changed_at FROM fetch_meta WHERE url = ?",
+            (url,)
+        ).fetchone()
+    if not row:
+        return None
+    etag, last_modified, digest, links, checked_at, changed_at = row
+    return {
+        "url": url,
+        "etag": etag,
+        "last_modified": last_modified,
+        "digest": digest,
+        "links": json.loads(links) if links is not None else None,
+        "checked_at": checked_at,
+        "changed_at": changed_at,
+    }
+
+
+def record_fetch(url: str, etag: Optional[str], last_modified: Optional[str], digest: Optional[str],
+                 links: Optional[List[str]] = None) -> None:
+    now = datetime.utcnow().isoformat()
+    with conn() as c:
+        c.execute("""
+            INSERT INTO fetch_meta (url, etag, last_modified, digest, links, checked_at, changed_at, checks, changes)
+            VALUES (?, ?, ?, ?, ?, ?, ?, 1, 1)
+            ON CONFLICT(url) DO UPDATE SET
+              checks=COALESCE(fetch_meta.checks, 0) + 1,
+              changes=COALESCE(fetch_meta.changes, 0)
+                      + CASE WHEN fetch_meta.digest IS excluded.digest THEN 0 ELSE 1 END,
+              etag=excluded.etag,
+              last_modified=excluded.last_modified,
+              changed_at=CASE WHEN fetch_meta.digest IS excluded.digest
+                              THEN fetch_meta.changed_at ELSE excluded.changed_at END,
+              digest=excluded.digest,
+              links=COALESCE(excluded.links, fetch_meta.links),
+              checked_at=excluded.checked_at
+        """, (url, etag, last_modified, digest,
+              json.dumps(links) if links is not None else None, now, now))
+        c.commit()
+
+
+def touch_fetch(url: str) -> None:
+    with conn() as c:
+        c.execute("UPDATE fetch_meta SET checked_at = ?, checks = COALESCE(checks, 0) + 1 WHERE url = ?",
+                  (datetime.utcnow().isoformat(), url))
+        c.commit()
+
+
+def change_rates(urls: List[str]) -> Dict[str, float]:
+    # fraction of checks that found a new body, per URL we have history for
+    if not urls:
+        return {}
+    marks = ",".join("?" for _ in urls)
+    with conn() as c:
+        rows = c.execute(
+            f"SELECT url, checks, changes FROM fetch_meta WHERE url IN ({marks})", tuple(urls)
+        ).fetchall()
+    return {u: (ch or 0) / ck for u, ck, ch in rows if ck}
@@ -0,0 +1,142 @@
+# storage/jobs.py
+import json
+import uuid
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+from .db import conn, ensure_schema, add_column
+
+
+ensure_schema()
+
+
+with conn() as c:
+    c.executescript("""
+    CREATE TABLE IF NOT EXISTS jobs (
+      id TEXT PRIMARY KEY,
+      key TEXT,                          -- identical seed sets share a key
+      user_id TEXT,
+      seeds TEXT,                        -- JSON string
+      limit_per_site INTEGER,
+      status TEXT,                       -- queued | running | done | failed | cancelled
+      error TEXT,
+      created_at TEXT,
+      updated_at TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_jobs_key_status ON jobs(key, status);
+
+    CREATE TABLE IF NOT EXISTS job_items (
+      job_id TEXT,
+      idx INTEGER,
+      url TEXT,
+      status TEXT,                       -- pending | ok | unchanged | duplicate | error
+      result TEXT,                       -- JSON string
+      updated_at TEXT,
+      PRIMARY KEY (job_id, idx)
+    );
+    """)
+    add_column(c, "jobs", "city", "TEXT")
+    c.commit()
+
+ACTIVE = ("queued", "running")
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat()
+
+
+def create_job(key: str, user_id: str, seeds: List[str], limit_per_site: int,
+               city: Optional[str] = None) -> str:
+    job_id = uuid.uuid4().hex
+    now = _now()
+    with conn() as c:
+        c.execute("""
+            INSERT INTO jobs (id, key, user_id, city, seeds, limit_per_site, status, error, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, 'queued', NULL, ?, ?)
+        """, (job_id, key, user_id, city, json.dumps(seeds), limit_per_site, now, now))
+        c.commit()
+    return job_id
+
+
+def find_active_job(key: str) -> Optional[str]:
+    with conn() as c:
+        row = c.execute(
+            "SELECT id FROM jobs WHERE key = ? AND status IN (?, ?) ORDER BY created_at DESC LIMIT 1",
+            (key, *ACTIVE)
+        ).fetchone()
+    return row[0] if row else None
+
+
+def active_job_ids() -> List[str]:
+    with conn() as c:
+        rows = c.execute(
+            "SELECT id FROM jobs WHERE status IN (?, ?) ORDER BY created_at", ACTIVE
+        ).fetchall()
+    return [r[0] for r in rows]
+
+
+def set_job_status(job_id: str, status: str, error: Optional[str] = None) -> None:
+    with conn() as c:
+        c.execute("UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                  (status, error, _now(), job_id))
+        c.commit()
+
+
+def set_job_urls(job_id: str, urls: List[str]) -> None:
+    now = _now()
+    with conn() as c:
+        c.executemany("""
+            INSERT OR IGNORE INTO job_items (job_id, idx, url, status, result, updated_at)
+            VALUES (?, ?, ?, 'pending', NULL, ?)
+        """, [(job_id, i, u, now) for i, u in enumerate(urls)])
+        c.commit()
+
+
+def record_job_item(job_id: str, idx: int, status: str, result: Dict[str, Any]) -> None:
+    with conn() as c:
+        c.execute("UPDATE job_items SET status = ?, result = ?, updated_at = ? WHERE job_id = ? AND idx = ?",
+                  (status, json.dumps(result, ensure_ascii=False), _now(), job_id, idx))
+        c.execute("UPDATE jobs SET updated_at = ? WHERE id = ?", (_now(), job_id))
+        c.commit()
+
+
+def get_job(job_id: str, with_items: bool = True) -> Optional[Dict[str, Any]]:
+    with conn() as c:
+        row = c.execute("""
+            SELECT id, key, user_id, city, seeds, limit_per_site, status, error, created_at, updated_at
+            FROM jobs WHERE id = ?
+        """, (job_id,)).fetchone()
+        if not row:
+            return None
+        counts = dict(c.execute(
+            "SELECT status, COUNT(*) FROM job_items WHERE job_id = ? GROUP BY status", (job_id,)
+        ).fetchall())
+        items = c.execute(
+            "SELECT idx, url, status, result FROM job_items WHERE job_id = ? ORDER BY idx", (job_id,)
+        ).fetchall() if with_items else []
+
+    (jid, key, uid, city, seeds, limit, status, error, created, updated) = row
+    total = sum(counts.values())
+    return {
+        "id": jid,
+        "key": key,
+        "user_id": uid,
+        "city": city,
+        "seeds": json.loads(seeds or "[]"),
+        "limit_per_site": limit,
+        "status": status,
+        "error": error,
+        "created_at": created,
+        "updated_at": updated,
+        "progress": {
+            "total": total,
+            "done": total - counts.get("pending", 0),
+            "ok": counts.get("ok", 0),
+            "unchanged": counts.get("unchanged", 0),
+            "duplicates": counts.get("duplicate", 0),
+            "errors": counts.get("error", 0),
+        },
+        "items": [
+            {"index": i, "url": u, "status": st, "result": json.loads(res) if res else None}
+            for (i, u, st, res) in items
+        ],
+    }
@@ -0,0 +1,89 @@
+# storage/search.py
+import re
+import sqlite3
+from typing import List, Dict, Any, Optional
+from .db import conn, ensure_schema
+from . import subscriptions  # noqa: F401  (creates the table search_docs filters on)
+
+
+ensure_schema()
+
+
+with conn() as c:
+    existed = c.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'civic_docs_fts'"
+    ).fetchone()
+    # rowid = civic_docs.id; the FTS table keeps its own copy of the text so
+    # snippet() works and searches never touch the JSON columns
+    c.executescript("""
+    CREATE VIRTUAL TABLE IF NOT EXISTS civic_docs_fts USING fts5(
+      title, tl_dr, highlights, body,
+      tokenize = 'porter unicode61'
+    );
+    """)
+    has_docs = c.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'civic_docs'"
+    ).fetchone()
+    if not existed and has_docs:
+        c.execute("""
+            INSERT INTO civic_docs_fts (rowid, title, tl_dr, highlights, body)
+            SELECT id, title, tl_dr,
+                   (SELECT group_concat(value, ' ') FROM json_each(civic_docs.what_residents_should_know)),
+                   ''
+            FROM civic_docs
+        """)
+    c.commit()
+
+# column weights for bm25(): title, tl_dr, highlights, body
+BM25_WEIGHTS = (10.0, 4.0, 4.0, 1.0)
+
+
+def index_doc(c: sqlite3.Connection, doc_id: int, title: str, tl_dr: str,
+              highlights: List[str], body: str) -> None:
+    # called inside save_docs' transaction so the index never lags the feed
+    c.execute(
+        "INSERT OR REPLACE INTO civic_docs_fts (rowid, title, tl_dr, highlights, body) VALUES (?, ?, ?, ?, ?)",
+        (doc_id, title or "", tl_dr or "", " ".join(highlights or []), body or ""),
+    )
+
+
+def _fts_query(q: str) -> str:
+    # quote every term so user input like "bike-lane" or "C++" can't hit FTS5 syntax;
+    # "quoted phrases" are kept together and terms are ANDed
+    terms = re.findall(r'"([^"]+)"|(\S+)', q or "")
+    parts = []
+    for phrase, word in terms:
+        t = (phrase or word).replace('"', '""').strip()
+        if t:
+            parts.append(f'"{t}"')
+    return " ".join(parts)
+
+
+def search_docs(q: str, user_id: Optional[str] = None, city: Optional[str] = None,
+                limit: int = 20) -> List[Dict[str, Any]]:
+    match = _fts_query(q)
+    if not match:
+        return []
+    sql = f"""
+        SELECT d.id, d.user_id, d.city, d.url, d.title, d.tl_dr, d.fetched_at,
+               snippet(civic_docs_fts, -1, '[', ']', '…', 16) AS snippet,
+               bm25(civic_docs_fts, {", ".join(str(w) for w in BM25_WEIGHTS)}) AS rank
+        FROM civic_docs_fts
+        JOIN civic_docs d ON d.id = civic_docs_fts.rowid
+        WHERE civic_docs_fts MATCH ?
+    """
+    args: List[Any] = [match]
+    if user_id:
+        # same scope as get_feed: own docs plus every city the user follows
+        sql += " AND (d.user_id = ? OR d.city IN (SELECT city FROM subscriptions WHERE user_id = ?))"
+        args += [user_id, user_id]
+    if city:
+        sql += " AND d.city = ?"
+        args.append(city)
+    sql += " ORDER BY rank LIMIT ?"
+    args.append(limit)
+
+    with conn() as c:
+        rows = c.execute(sql, tuple(args)).fetchall()
+    keys = ["id", "user_id", "city", "url", "title", "tl_dr", "fetched_at", "snippet", "rank"]
+    return [dict(zip(keys, r)) for r in rows]
@@ -0,0 +1,84 @@
+# storage/subscriptions.py
+import json
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional
+from .db import conn, ensure_schema
+
+
+ensure_schema()
+
+
+with conn() as c:
+    c.executescript("""
+    -- which city feeds a user reads; docs are stored once per city
+    CREATE TABLE IF NOT EXISTS subscriptions (
+      user_id TEXT,
+      city TEXT,
+      created_at TEXT,
+      PRIMARY KEY (user_id, city)
+    );
+    CREATE INDEX IF NOT EXISTS idx_subscriptions_city ON subscriptions(city);
+
+    -- last completed agent run per city, so repeat runs can answer from shared docs
+    CREATE TABLE IF NOT EXISTS city_runs (
+      city TEXT PRIMARY KEY,
+      seeds TEXT,                        -- JSON string
+      summary TEXT,                      -- JSON string
+      finished_at TEXT
+    );
+    """)
+    c.commit()
+
+
+def city_key(city: str, region: Optional[str] = "", country: Optional[str] = "US") -> str:
+    name = "".join((city or "").split()).replace(".", "").replace("-", "")
+    return f"{name},{(region or '').upper()},{(country or 'US').upper()}"
+
+
+def set_subscriptions(user_id: str, cities: List[str]) -> None:
+    # the user's home jurisdictions (a city, or the nearest city + county);
+    # replaces whatever they followed before
+    cities = list(dict.fromkeys(cities))
+    with conn() as c:
+        c.execute(f"DELETE FROM subscriptions WHERE user_id = ? AND city NOT IN ({','.join('?' * len(cities))})",
+                  (user_id, *cities))
+        now = datetime.utcnow().isoformat()
+        c.executemany("INSERT OR IGNORE INTO subscriptions (user_id, city, created_at) VALUES (?, ?, ?)",
+                      [(user_id, city, now) for city in cities])
+        c.commit()
+
+
+def record_city_run(city: str, seeds: List[str], summary: Dict[str, Any]) -> None:
+    with conn() as c:
+        c.execute("""
+            INSERT INTO city_runs (city, seeds, summary, finished_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT(city) DO UPDATE SET
+              seeds=excluded.seeds, summary=excluded.summary, finished_at=excluded.finished_at
+        """, (city, json.dumps(seeds), json.dumps(summary, ensure_ascii=False), datetime.utcnow().isoformat()))
+        c.commit()
+
+
+def recent_city_run(city: str, max_age_seconds: float) -> Optional[Dict[str, Any]]:
+    if max_age_seconds <= 0:
+        return None
+    cutoff = (datetime.utcnow() - timedelta(seconds=max_age_seconds)).isoformat()
+    with conn() as c:
+        row = c.execute(
+            "SELECT seeds, summary, finished_at FROM city_runs WHERE city = ? AND finished_at >= ?",
+            (city, cutoff)
+        ).fetchone()
+    if not row:
+        return None
+    return {"city": city, "seeds": json.loads(row[0]), "summary": json.loads(row[1]), "finished_at": row[2]}
+
+
+def subscriber_counts() -> Dict[str, int]:
+    with conn() as c:
+        rows = c.execute("SELECT city, COUNT(*) FROM subscriptions GROUP BY city").fetchall()
+    return dict(rows)
+
+
+def city_run_times() -> Dict[str, str]:
+    with conn() as c:
+        rows = c.execute("SELECT city, finished_at FROM city_runs").fetchall()
+    return dict(rows)